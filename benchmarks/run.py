@@ -0,0 +1,219 @@
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+repo_dir = os.path.dirname(script_dir)
+if repo_dir not in sys.path:
+    sys.path.insert(0, repo_dir)
+
+# Benchmarks for the editor's hot paths, printed as JSON:
+#   python benchmarks/run.py --shapes 20000 --output results.json
+import argparse
+import datetime
+import json
+import platform
+import random
+import statistics
+import subprocess
+import tempfile
+import time
+from document.drawing_io import read_drawing, write_drawing
+from document.shape_arrays import HAS_NUMPY
+from geometry.point import Point
+from renderer.renderer import Renderer
+from renderer.svg_renderer import SVGRenderer
+from state.eraser_state import EraserState
+from synthetic import generate_document, generate_nested_composite
+
+
+class CountingRenderer(Renderer):
+    # headless stand-in for TkinterRenderer
+    def __init__(self):
+        self.primitives = 0
+
+    def draw_line(self, start, end):
+        self.primitives += 1
+
+    def fill_polygon(self, points):
+        self.primitives += 1
+
+
+def measure(function, repeat, setup=None):
+    # setup() runs before every timed call and is not measured
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+
+    return {
+        'repeat': repeat,
+        'min_s': min(timings),
+        'median_s': statistics.median(timings),
+        'mean_s': statistics.fmean(timings),
+    }
+
+
+# -- Benchmarks, each returns (params, function, setup) --
+def bench_find_selected(args, model):
+    rng = random.Random(args.seed)
+    clicks = [Point(rng.uniform(0, args.width), rng.uniform(0, args.height)) for _ in range(args.clicks)]
+
+    def run():
+        for p in clicks:
+            model.find_selected_graphical_object(p)
+    return {'clicks': args.clicks}, run, None
+
+
+def bench_eraser(args, model):
+    rng = random.Random(args.seed)
+    x, y = rng.uniform(0, args.width), rng.uniform(0, args.height)
+    stroke = []
+    for _ in range(args.stroke_points):
+        x += rng.uniform(-20, 20)
+        y += rng.uniform(-20, 20)
+        stroke.append(Point(x, y))
+
+    state = EraserState(model)
+    erased = model.list()
+
+    def setup():
+        # put back whatever the previous run erased
+        current = set(model.list())
+        with model.history.suspended(), model.batch():
+            for obj in erased:
+                if obj not in current:
+                    model.add_graphical_object(obj)
+
+    def run():
+        # hit testing happens while dragging, so the whole stroke is timed
+        state.mouse_down(stroke[0], False, False)
+        for p in stroke[1:-1]:
+            state.mouse_dragged(p)
+        state.mouse_up(stroke[-1], False, False)
+    return {'stroke_points': args.stroke_points}, run, setup
+
+
+def bench_composite_bbox(args, model):
+    group = generate_nested_composite(args.depth, seed=args.seed)
+
+    def setup():
+        # drop every cached box so the whole tree is walked
+        stack = [group]
+        while stack:
+            obj = stack.pop()
+            obj.cached_bounding_box = None
+            stack.extend(getattr(obj, 'children', ()))
+
+    def run():
+        group.get_bounding_box()
+    return {'depth': args.depth}, run, setup
+
+
+def bench_text_round_trip(args, model):
+    return _round_trip(model, '.txt')
+
+
+def bench_binary_round_trip(args, model):
+    return _round_trip(model, '.gbin')
+
+
+def _round_trip(model, extension):
+    objects = model.list()
+    path = os.path.join(tempfile.gettempdir(), f'goatpaint-bench{extension}')
+
+    def run():
+        write_drawing(path, objects)
+        read_drawing(path)
+    return {'format': extension}, run, None
+
+
+def bench_svg_export(args, model):
+    objects = model.list()
+    path = os.path.join(tempfile.gettempdir(), 'goatpaint-bench.svg')
+
+    def run():
+        with SVGRenderer(path, stream=True, view_box=model.get_bounding_box()) as renderer:
+            for obj in objects:
+                obj.render(renderer)
+    return {}, run, None
+
+
+def bench_headless_render(args, model):
+    def run():
+        renderer = CountingRenderer()
+        for obj in model.list():
+            obj.render(renderer)
+    return {}, run, None
+
+
+BENCHMARKS = {
+    'find_selected_graphical_object': bench_find_selected,
+    'eraser_stroke': bench_eraser,
+    'composite_bounding_box': bench_composite_bbox,
+    'text_save_load': bench_text_round_trip,
+    'binary_save_load': bench_binary_round_trip,
+    'svg_export': bench_svg_export,
+    'headless_render': bench_headless_render,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=repo_dir, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run the GoatPaint benchmarks.')
+    parser.add_argument('--shapes', type=int, default=20000, help='leaves in the synthetic drawing')
+    parser.add_argument('--width', type=float, default=4000)
+    parser.add_argument('--height', type=float, default=4000)
+    parser.add_argument('--clicks', type=int, default=200)
+    parser.add_argument('--stroke-points', type=int, default=200)
+    parser.add_argument('--depth', type=int, default=200, help='nesting depth for the composite benchmark')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--only', nargs='*', choices=sorted(BENCHMARKS), help='run a subset')
+    parser.add_argument('--output', help='write the JSON here instead of stdout')
+    args = parser.parse_args(argv)
+
+    model = generate_document(args.shapes, width=args.width, height=args.height, seed=args.seed)
+
+    results = []
+    for name in args.only or BENCHMARKS:
+        params, function, setup = BENCHMARKS[name](args, model)
+        result = {'name': name, 'params': params}
+        result.update(measure(function, args.repeat, setup))
+        results.append(result)
+        print(f'{name:32} median {result["median_s"]:.6f}s', file=sys.stderr)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'numpy': HAS_NUMPY,
+            'shapes': args.shapes,
+            'top_level_objects': len(model.list()),
+            'seed': args.seed,
+        },
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+import random
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.point import Point
+from geometry.composite_shape import CompositeShape
+from document.document_model import DocumentModel
+
+
+def generate_objects(num_shapes, width=4000, height=4000, max_size=60,
+                     oval_ratio=0.5, group_size=8, group_ratio=0.1, group_extent=300, seed=0):
+    # Deterministic drawing of num_shapes leaves (lines and ovals).
+    # About group_ratio of the leaves end up in composites of group_size
+    # nearby children, and every other group is nested inside a neighbouring one.
+    rng = random.Random(seed)
+    objects = []
+    pending_group = None
+
+    leaves_left = num_shapes
+    while leaves_left > 0:
+        if rng.random() < group_ratio and leaves_left >= group_size:
+            if pending_group is None:
+                x = rng.uniform(0, width - group_extent)
+                y = rng.uniform(0, height - group_extent)
+            children = [_random_leaf(rng, group_extent, group_extent, max_size, oval_ratio, x, y)
+                        for _ in range(group_size)]
+            leaves_left -= group_size
+            if pending_group is not None:
+                children.append(pending_group)
+                pending_group = None
+                objects.append(CompositeShape(children))
+            else:
+                pending_group = CompositeShape(children)
+        else:
+            objects.append(_random_leaf(rng, width, height, max_size, oval_ratio))
+            leaves_left -= 1
+
+    if pending_group is not None:
+        objects.append(pending_group)
+    return objects
+
+
+def generate_nested_composite(depth, leaves_per_level=2, seed=0):
+    # a single group nested depth levels deep
+    rng = random.Random(seed)
+    group = CompositeShape([_random_leaf(rng, 1000, 1000, 60, 0.5) for _ in range(leaves_per_level)])
+    for _ in range(depth - 1):
+        children = [_random_leaf(rng, 1000, 1000, 60, 0.5) for _ in range(leaves_per_level)]
+        group = CompositeShape(children + [group])
+    return group
+
+
+def generate_document(num_shapes, **kwargs):
+    model = DocumentModel()
+    with model.history.suspended(), model.batch():
+        for obj in generate_objects(num_shapes, **kwargs):
+            model.add_graphical_object(obj)
+    return model
+
+
+def _random_leaf(rng, width, height, max_size, oval_ratio, left=0, top=0):
+    x = left + rng.uniform(0, width)
+    y = top + rng.uniform(0, height)
+    p1 = Point(x, y)
+    p2 = Point(x + rng.uniform(-max_size, max_size), y + rng.uniform(-max_size, max_size))
+    return Oval(p1, p2) if rng.random() < oval_ratio else LineSegment(p1, p2)
@@ -0,0 +1,107 @@
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.insert(0, script_dir)
+
+# Headless batch converter, never imports tkinter:
+#   python convert.py drawings/ -o exports/ --format svg --jobs 8
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from document.drawing_io import create_prototype_map, read_drawing, write_drawing
+from renderer.svg_renderer import SVGRenderer
+from renderer.raster_renderer import render_png
+from geometry.utils import union_of_rectangles
+
+OUTPUT_EXTENSIONS = {'svg': '.svg', 'svgz': '.svgz', 'gbin': '.gbin', 'png': '.png'}
+INPUT_EXTENSIONS = ('.txt', '.gbin')
+
+
+def convert_file(source, target, output_format):
+    # runs in a worker process, returns the elapsed seconds
+    start = time.perf_counter()
+    objects = read_drawing(source, create_prototype_map())
+
+    if output_format == 'gbin':
+        write_drawing(target, objects)
+    elif output_format == 'png':
+        # files are already spread over processes, tiles stay in this one
+        render_png(objects, target)
+    else:
+        view_box = union_of_rectangles(obj.get_bounding_box() for obj in objects)
+        with SVGRenderer(target, stream=True, view_box=view_box) as renderer:
+            for obj in objects:
+                obj.render(renderer)
+
+    return time.perf_counter() - start
+
+
+def collect_inputs(paths):
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(INPUT_EXTENSIONS):
+                    sources.append(os.path.join(path, name))
+        else:
+            sources.append(path)
+    return sources
+
+
+def target_path(source, output_dir, output_format):
+    name = os.path.splitext(os.path.basename(source))[0] + OUTPUT_EXTENSIONS[output_format]
+    return os.path.join(output_dir or os.path.dirname(source), name)
+
+
+def positive_int(value):
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f'must be at least 1: {value}')
+    return number
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Convert GoatPaint drawings without a display.')
+    parser.add_argument('inputs', nargs='+', help='drawing files or directories of drawings')
+    parser.add_argument('-o', '--output-dir', help='defaults to the directory of each input')
+    parser.add_argument('-f', '--format', choices=sorted(OUTPUT_EXTENSIONS), default='svg')
+    parser.add_argument('-j', '--jobs', type=positive_int, default=os.cpu_count() or 1,
+                        help='worker processes, 1 converts in this process')
+    args = parser.parse_args(argv)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    jobs = [(source, target_path(source, args.output_dir, args.format))
+            for source in collect_inputs(args.inputs)]
+
+    failures = 0
+    start = time.perf_counter()
+
+    def report(source, convert):
+        nonlocal failures
+        try:
+            elapsed = convert()
+        except Exception as e:
+            failures += 1
+            print(f'FAIL {source}: {e}', file=sys.stderr)
+        else:
+            print(f'ok   {elapsed:8.3f}s  {source}')
+
+    if args.jobs == 1:
+        for source, target in jobs:
+            report(source, lambda: convert_file(source, target, args.format))
+    else:
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = {pool.submit(convert_file, source, target, args.format): source
+                       for source, target in jobs}
+            for future in as_completed(futures):
+                report(futures[future], future.result)
+
+    print(f'{len(jobs) - failures} converted, {failures} failed in {time.perf_counter() - start:.3f}s')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,400 @@
+# autosave.py
+# Crash recovery for a DocumentModel. AutosaveJournal listens to the model
+# on the UI thread and only captures the hot points of the object an event
+# is about; a writer thread turns them into save rows, appends those to a
+# journal and, every COMPACT_RECORDS records, rewrites a full snapshot
+# from its own mirror of the document (z-order of ids plus rows per id).
+# The UI thread never serializes anything. Journal records:
+#   <seq> A <id> <index> <n>   added, followed by n save rows
+#   <seq> R <id> <index>       removed
+#   <seq> C <id> <n>           changed, followed by n save rows
+#   <seq> Z <old> <new>        moved in z-order
+# The snapshot starts with 'SNAPSHOT <seq> <objects>' and lists every
+# object as '<id> <n>' plus its rows. Records up to <seq> are already in
+# it, so a crash between writing the snapshot and truncating the journal
+# replays nothing twice.
+# Every running instance journals into its own session directory and holds
+# an exclusive lock on it. The OS drops the lock when the process dies, so
+# an unlocked session is one that didn't exit cleanly.
+import os
+import queue
+import tempfile
+import threading
+from listeners.document_model.document_model_listener import DocumentModelListener
+from .drawing_io import read_objects
+from .gc_pause import paused_gc
+from .history import capture_geometry, copy_with_geometry
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SNAPSHOT_NAME = 'snapshot.txt'
+JOURNAL_NAME = 'journal.txt'
+LOCK_NAME = 'lock'
+SESSION_PREFIX = 'session-'
+
+
+class SessionLocked(Exception):
+    pass
+
+
+class AutosaveSession:
+    # a directory holding one autosave, owned by whoever locks it
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock_file = None
+
+    def lock(self):
+        # False if another instance holds the session
+        lock_file = open(os.path.join(self.directory, LOCK_NAME), 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            lock_file.close()
+            return False
+        self.lock_file = lock_file
+        return True
+
+    def unlock(self):
+        if self.lock_file is None:
+            return
+        if fcntl is None:
+            self.lock_file.seek(0)
+            msvcrt.locking(self.lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+        self.lock_file.close()
+        self.lock_file = None
+
+    def recover(self, prototype_map=None):
+        return recover_autosave(self.directory, prototype_map)
+
+    def discard(self):
+        # removes the session, the lock last so nobody claims it meanwhile
+        for name in (SNAPSHOT_NAME, JOURNAL_NAME, LOCK_NAME):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+        self.unlock()
+        try:
+            os.rmdir(self.directory)
+        except OSError:
+            pass  # not empty or already gone, left for later
+
+
+def new_session_directory(root):
+    os.makedirs(root, exist_ok=True)
+    return tempfile.mkdtemp(prefix=SESSION_PREFIX, dir=root)
+
+
+def claim_orphaned_session(root):
+    # the most recently written session nobody holds, locked for the
+    # caller; sessions with nothing to recover are removed on the way
+    try:
+        names = [name for name in os.listdir(root) if name.startswith(SESSION_PREFIX)]
+    except FileNotFoundError:
+        return None
+
+    directories = []
+    for name in names:
+        directory = os.path.join(root, name)
+        try:
+            directories.append((os.path.getmtime(directory), directory))
+        except OSError:
+            pass  # removed meanwhile
+    for _, directory in sorted(directories, reverse=True):
+        session = AutosaveSession(directory)
+        try:
+            if not session.lock():
+                continue
+        except OSError:
+            continue
+        if os.path.exists(os.path.join(directory, SNAPSHOT_NAME)):
+            return session
+        session.discard()
+    return None
+
+
+class JournalMirror:
+    # what the journal says the document looks like, shared by the writer
+    # thread and recovery
+    def __init__(self):
+        self.order = []  # ids bottom to top
+        self.rows = {}  # id -> save rows
+        self.seq = 0
+
+    def apply(self, record):
+        kind = record[0]
+        if kind == 'A':
+            _, obj_id, index, rows = record
+            self.order.insert(index, obj_id)
+            self.rows[obj_id] = rows
+        elif kind == 'R':
+            _, obj_id, index = record
+            del self.order[index]
+            del self.rows[obj_id]
+        elif kind == 'C':
+            _, obj_id, rows = record
+            self.rows[obj_id] = rows
+        elif kind == 'Z':
+            _, old_index, new_index = record
+            self.order.insert(new_index, self.order.pop(old_index))
+        else:
+            # 'O': the whole z-order, rows only for objects new to the mirror
+            _, items = record
+            self.rows = {obj_id: self.rows[obj_id] if rows is None else rows for obj_id, rows in items}
+            self.order = [obj_id for obj_id, _ in items]
+
+    def objects(self, prototype_map=None):
+        objects = []
+        for obj_id in self.order:
+            objects.extend(read_objects(self.rows[obj_id], prototype_map))
+        return objects
+
+    # -- Files --
+    def write_snapshot(self, path):
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(f'SNAPSHOT {self.seq} {len(self.order)}\n')
+            for obj_id in self.order:
+                rows = self.rows[obj_id]
+                f.write(f'{obj_id} {len(rows)}\n')
+                for row in rows:
+                    f.write(row)
+                    f.write('\n')
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+
+    def read_snapshot(self, path):
+        with open(path, 'r') as f:
+            _, seq, count = f.readline().split()
+            for _ in range(int(count)):
+                obj_id, num_rows = f.readline().split()
+                self.order.append(int(obj_id))
+                self.rows[int(obj_id)] = [f.readline().rstrip('\n') for _ in range(int(num_rows))]
+        self.seq = int(seq)
+
+    def replay_journal(self, path):
+        # stops at the first record the crash left incomplete
+        with open(path, 'r') as f:
+            lines = f.read().split('\n')
+
+        i = 0
+        while i < len(lines) and lines[i]:
+            fields = lines[i].split()
+            try:
+                seq, kind, args = int(fields[0]), fields[1], [int(field) for field in fields[2:]]
+                if kind in ('A', 'C'):
+                    rows = lines[i + 1:i + 1 + args[-1]]
+                    record = (kind, args[0], args[1], rows) if kind == 'A' else (kind, args[0], rows)
+                else:
+                    rows = []
+                    record = (kind, args[0], args[1])
+            except (ValueError, IndexError):
+                break
+            # a complete record ends with a newline, i.e. more lines follow
+            i += 1 + len(rows)
+            if i >= len(lines):
+                break
+            if seq > self.seq:
+                self.apply(record)
+                self.seq = seq
+
+
+def recover_autosave(directory, prototype_map=None):
+    # the drawing left behind by a session that didn't close cleanly,
+    # None if there is nothing to recover
+    snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+    journal_path = os.path.join(directory, JOURNAL_NAME)
+    if not os.path.exists(snapshot_path):
+        return None
+
+    mirror = JournalMirror()
+    mirror.read_snapshot(snapshot_path)
+    if os.path.exists(journal_path):
+        mirror.replay_journal(journal_path)
+    return mirror.objects(prototype_map)
+
+
+class AutosaveJournal(DocumentModelListener):
+    COMPACT_RECORDS = 2000  # journal records between snapshots
+
+    def __init__(self, model, directory):
+        self.model = model
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.session = AutosaveSession(directory)
+        if not self.session.lock():
+            raise SessionLocked(f'Autosave session in use: {directory}')
+        self.snapshot_path = os.path.join(directory, SNAPSHOT_NAME)
+        self.journal_path = os.path.join(directory, JOURNAL_NAME)
+        self.ids = {}  # object -> id, only touched on the UI thread
+        self.next_id = 0
+        self.error = None  # last OSError of the writer thread
+
+        # the writer thread owns everything below
+        self.records = queue.Queue()
+        self.mirror = JournalMirror()
+        self.journal = None
+        self.journal_records = 0
+
+        self.thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+        self.thread.start()
+        # the current document becomes the first snapshot
+        self.document_change()
+        model.add_document_model_listener(self)
+
+    def close(self, discard=False):
+        # stops the writer once everything queued is on disk; discard=True
+        # removes the session, e.g. when the application exits normally,
+        # otherwise it is left unlocked for recovery
+        self.model.remove_document_model_listener(self)
+        self.records.put(None)
+        self.thread.join()
+        if discard:
+            self.session.discard()
+        else:
+            self.session.unlock()
+
+    def _capture(self, obj):
+        # Points are immutable, so this stays valid whatever happens to obj
+        # next; the writer thread builds the rows from it
+        return obj, capture_geometry(obj)
+
+    def _new_id(self, obj):
+        self.next_id += 1
+        self.ids[obj] = self.next_id
+        return self.next_id
+
+    # -- Document model events, on the UI thread --
+    def document_change(self):
+        # the z-order can't be told from a coarse event, so the writer gets
+        # all of it; only objects it hasn't seen yet are captured
+        items = []
+        ids = {}
+        with paused_gc():
+            for obj in self.model.list():
+                obj_id = self.ids.get(obj)
+                if obj_id is None:
+                    items.append((self._new_id(obj), self._capture(obj)))
+                else:
+                    items.append((obj_id, None))
+                ids[obj] = self.ids[obj]
+        self.ids = ids
+        self.records.put(('O', items))
+
+    def object_added(self, obj, index):
+        self.records.put(('A', self._new_id(obj), index, self._capture(obj)))
+
+    def object_removed(self, obj, index):
+        obj_id = self.ids.pop(obj, None)
+        if obj_id is not None:
+            self.records.put(('R', obj_id, index))
+
+    def object_changed(self, obj):
+        obj_id = self.ids.get(obj)
+        if obj_id is not None:
+            self.records.put(('C', obj_id, self._capture(obj)))
+
+    def selection_changed(self, obj):
+        pass
+
+    def z_order_changed(self, obj, old_index, new_index):
+        self.records.put(('Z', old_index, new_index))
+
+    # -- Writer thread --
+    def _run(self):
+        closing = False
+        while not closing:
+            records = [self.records.get()]
+            # whatever is queued goes out before the next flush
+            while not self.records.empty():
+                records.append(self.records.get())
+            # close() is the last thing put on the queue
+            closing = records[-1] is None
+            if closing:
+                records.pop()
+            try:
+                for record in self._coalesced(records):
+                    self._write(record)
+                if self.journal is not None:
+                    self.journal.flush()
+            except OSError as e:
+                self.error = e
+        self._close_journal()
+
+    @staticmethod
+    def _coalesced(records):
+        # of a run of whole z-orders only the last one counts, together
+        # with the captures of objects the earlier ones saw first
+        merged = []
+        for record in records:
+            if record[0] == 'O' and merged and merged[-1][0] == 'O':
+                captured = {obj_id: c for obj_id, c in merged[-1][1] if c is not None}
+                merged[-1] = ('O', [(obj_id, captured.get(obj_id) if c is None else c)
+                                    for obj_id, c in record[1]])
+            else:
+                merged.append(record)
+        return merged
+
+    @staticmethod
+    def _rows(captured):
+        # the live object may have changed since, a copy is saved instead
+        rows = []
+        copy_with_geometry(*captured).save(rows)
+        return rows
+
+    def _write(self, record):
+        kind = record[0]
+        if kind == 'A':
+            record = (kind, record[1], record[2], self._rows(record[3]))
+        elif kind == 'C':
+            record = (kind, record[1], self._rows(record[2]))
+        elif kind == 'O':
+            # nothing new and nothing moved, the last snapshot still stands
+            # (the first record always writes one)
+            items = record[1]
+            if (self.mirror.seq and all(c is None for _, c in items)
+                    and [obj_id for obj_id, _ in items] == self.mirror.order):
+                return
+            record = (kind, [(obj_id, None if captured is None else self._rows(captured))
+                             for obj_id, captured in record[1]])
+
+        mirror = self.mirror
+        mirror.apply(record)
+        mirror.seq += 1
+        if record[0] == 'O' or self.journal_records >= self.COMPACT_RECORDS:
+            self._compact()
+            return
+
+        if self.journal is None:
+            self.journal = open(self.journal_path, 'a')
+        if kind == 'A':
+            _, obj_id, index, rows = record
+            lines = [f'{mirror.seq} A {obj_id} {index} {len(rows)}', *rows]
+        elif kind == 'C':
+            _, obj_id, rows = record
+            lines = [f'{mirror.seq} C {obj_id} {len(rows)}', *rows]
+        else:
+            lines = [f'{mirror.seq} {kind} {record[1]} {record[2]}']
+        self.journal.write('\n'.join(lines) + '\n')
+        self.journal_records += 1
+
+    def _compact(self):
+        # the snapshot covers every record so far, the journal restarts empty
+        self.mirror.write_snapshot(self.snapshot_path)
+        self._close_journal()
+        self.journal = open(self.journal_path, 'w')
+        self.journal_records = 0
+
+    def _close_journal(self):
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
@@ -0,0 +1,231 @@
+# binary_drawing.py
+# Compact binary alternative to the text format, little-endian:
+#   header      magic, precision, leaf/composite/child/top-level counts
+#   kinds       one byte per leaf (0 = line, 1 = oval)
+#   coords      x1 y1 x2 y2 per leaf, float64 or float32
+#   composites  (first child ref, child count) per composite, int32
+#   child refs  int32 node refs, each composite's children are contiguous
+#   top refs    int32 node refs of the top-level objects, bottom to top
+# A node ref >= 0 is a leaf index, a ref < 0 is composite number -ref - 1.
+# BinaryDrawing memory-maps a file and builds each object on first access;
+# read_drawing() builds all of them.
+import mmap
+import struct
+import sys
+from array import array
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.composite_shape import CompositeShape
+from geometry.point import Point
+from .format_error import DrawingFormatError
+from .gc_pause import paused_gc
+
+MAGIC = b'GOATBIN1'
+BINARY_EXTENSION = '.gbin'
+
+HEADER = struct.Struct('<8sBxxxIIII')
+INT32 = struct.Struct('<i')
+COMPOSITE = struct.Struct('<ii')
+COORDS = {'d': struct.Struct('<4d'), 'f': struct.Struct('<4f')}
+
+LEAF_CLASSES = [LineSegment, Oval]
+
+
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def write_binary_drawing(file_path, objects, precision='d', progress=None):
+    # precision is 'd' (float64, exact) or 'f' (float32, half the size);
+    # progress(done, total) is called as top-level objects are encoded
+    kinds = bytearray()
+    coords = array(precision)
+    composites = array('i')
+    child_refs = array('i')
+    top_refs = array('i', [0]) * len(objects)
+
+    with paused_gc():
+        _encode(objects, kinds, coords, composites, child_refs, top_refs, progress)
+
+    with open(file_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, ord(precision), len(kinds), len(composites) // 2,
+                            len(child_refs), len(top_refs)))
+        for section in (kinds, _little_endian(coords), _little_endian(composites),
+                        _little_endian(child_refs), _little_endian(top_refs)):
+            f.write(bytes(_align(f.tell()) - f.tell()))
+            f.write(section)
+
+
+def _encode(objects, kinds, coords, composites, child_refs, top_refs, progress=None):
+    # iterative pre-order walk, so deep groups can't hit the recursion limit
+    stack = [(obj, top_refs, i) for i, obj in reversed(list(enumerate(objects)))]
+    while stack:
+        node, refs, position = stack.pop()
+        if progress is not None and refs is top_refs:
+            progress(position, len(top_refs))
+        if isinstance(node, CompositeShape):
+            refs[position] = -(len(composites) // 2) - 1
+            start = len(child_refs)
+            composites.extend((start, len(node.children)))
+            child_refs.extend([0] * len(node.children))
+            for j in range(len(node.children) - 1, -1, -1):
+                stack.append((node.children[j], child_refs, start + j))
+        elif type(node) in LEAF_CLASSES:
+            refs[position] = len(kinds)
+            kinds.append(LEAF_CLASSES.index(type(node)))
+            p1 = node.get_hot_point(0)
+            p2 = node.get_hot_point(1)
+            coords.extend((p1.x, p1.y, p2.x, p2.y))
+        else:
+            raise ValueError(f'Shape {node.get_shape_id()} has no binary representation')
+
+
+def is_binary_drawing(file_path):
+    with open(file_path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class BinaryDrawing:
+    # Read-only sequence of the top-level objects of a binary drawing.
+    # Opening only maps the file; each object is built on first access
+    # and then kept, so repeated access returns the same instance.
+    def __init__(self, file_path):
+        self.data = None
+        self.views = []
+        self.file = open(file_path, 'rb')
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, precision, leaf_count, composite_count, child_ref_count, top_count = HEADER.unpack_from(self.data)
+        except (ValueError, struct.error) as e:
+            self.close()
+            raise DrawingFormatError(f'Not a binary drawing: {file_path}') from e
+
+        precision = chr(precision)
+        if magic != MAGIC or precision not in COORDS:
+            self.close()
+            raise DrawingFormatError(f'Not a binary drawing: {file_path}')
+
+        offset = _align(HEADER.size)
+        self.kinds = self._section(offset, 'B', leaf_count)
+        offset = _align(offset + leaf_count)
+        self.coords = self._section(offset, precision, 4 * leaf_count)
+        offset = _align(offset + leaf_count * COORDS[precision].size)
+        self.composites = self._section(offset, 'i', 2 * composite_count)
+        offset = _align(offset + composite_count * COMPOSITE.size)
+        self.child_refs = self._section(offset, 'i', child_ref_count)
+        offset = _align(offset + child_ref_count * INT32.size)
+        self.top_refs = self._section(offset, 'i', top_count)
+
+        self.materialized = {}
+        self.built_composites = bytearray(composite_count)  # 1 once referenced
+
+    def _section(self, offset, type_code, count):
+        size = array(type_code).itemsize * count
+        if offset + size > len(self.data):
+            self.close()
+            raise DrawingFormatError('Truncated binary drawing')
+
+        if not self.views:
+            self.views.append(memoryview(self.data))
+        view = self.views[0][offset:offset + size]
+        self.views.append(view)
+        if sys.byteorder == 'little':
+            view = view.cast(type_code)
+            self.views.append(view)
+            return view
+
+        # big-endian hosts get a swapped copy instead of a zero-copy view
+        values = array(type_code, view.tobytes())
+        values.byteswap()
+        return values
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        for view in reversed(self.views):
+            view.release()
+        self.views = []
+        if self.data is not None:
+            self.data.close()
+            self.data = None
+        self.file.close()
+
+    def __len__(self):
+        return len(self.top_refs)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.top_refs)
+        if not 0 <= index < len(self.top_refs):
+            raise IndexError('Drawing index out of range')
+
+        obj = self.materialized.get(index)
+        if obj is None:
+            obj = self.materialized[index] = self._build(self.top_refs[index])
+        return obj
+
+    def __iter__(self):
+        materialized = self.materialized
+        for index, ref in enumerate(self.top_refs):
+            obj = materialized.get(index)
+            if obj is None:
+                obj = materialized[index] = self._build(ref)
+            yield obj
+
+    # A corrupt file must not crash or loop the loader, so every ref is
+    # checked as it is followed. A composite may be referenced once only:
+    # that rules out cycles, and shared children that would blow up into
+    # exponentially many leaves.
+    def _build_leaf(self, leaf):
+        if leaf >= len(self.kinds) or self.kinds[leaf] >= len(LEAF_CLASSES):
+            raise DrawingFormatError(f'Corrupt binary drawing: bad leaf ref {leaf}')
+        c = self.coords
+        i = 4 * leaf
+        return LEAF_CLASSES[self.kinds[leaf]](Point(c[i], c[i + 1]), Point(c[i + 2], c[i + 3]))
+
+    def _child_refs(self, composite):
+        if not 0 <= composite < len(self.built_composites):
+            raise DrawingFormatError(f'Corrupt binary drawing: bad composite ref {-composite - 1}')
+        if self.built_composites[composite]:
+            raise DrawingFormatError(f'Corrupt binary drawing: composite {composite} is referenced twice')
+        self.built_composites[composite] = 1
+
+        start = self.composites[2 * composite]
+        count = self.composites[2 * composite + 1]
+        if start < 0 or count < 0 or start + count > len(self.child_refs):
+            raise DrawingFormatError(f'Corrupt binary drawing: composite {composite} out of range')
+        # a copy, a slice of the map would keep it from closing
+        return self.child_refs[start:start + count].tolist()
+
+    def _build(self, ref):
+        if ref >= 0:
+            return self._build_leaf(ref)
+
+        # composites are assembled bottom-up from an explicit stack
+        root_children = []
+        stack = [(self._child_refs(-ref - 1), root_children)]
+        while stack:
+            pending, built = stack[-1]
+            if len(built) == len(pending):
+                stack.pop()
+                if stack:
+                    stack[-1][1].append(CompositeShape(built))
+                continue
+
+            child = pending[len(built)]
+            if child >= 0:
+                built.append(self._build_leaf(child))
+            else:
+                stack.append((self._child_refs(-child - 1), []))
+
+        return CompositeShape(root_children)
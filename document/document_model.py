@@ -1,28 +1,53 @@
 # document_model.py
+from contextlib import contextmanager
 from geometry.graphical_object import AbstractGraphicalObject
 from listeners.graphical_object.graphical_object_listener import GraphicalObjectListener
 from listeners.document_model.document_model_listener import DocumentModelListener
 from geometry.point import Point
+from geometry.utils import rectangles_intersect, union_of_rectangles, segment_bounding_box
+from .spatial_index import SpatialIndex
+from .shape_arrays import ShapeArrays, HAS_NUMPY
+from .z_order_list import ZOrderList
+from .history import CommandHistory
 
 class DocumentModel(GraphicalObjectListener):
     SELECTION_PROXIMITY: float = 10.0
+    VECTORIZE_THRESHOLD: int = 64  # candidates needed before NumPy pays off
+    BATCH_REPLAY_LIMIT: int = 64  # structural events replayed one by one after a batch
 
     def __init__(self):
-        self.objects = []
-        self.selected_objects = []
+        self.objects = ZOrderList()
+        self.selected_objects = {}  # dict as an insertion-ordered set
         self.listeners = []
+        self.spatial_index = SpatialIndex()
+        self.shape_arrays = ShapeArrays() if HAS_NUMPY else None
+        self.history = CommandHistory(self)
+        # pending notifications while inside batch()
+        self.batch_depth = 0
+        self.batch_document_changed = False
+        self.batch_structure_events = []
+        self.batch_changed_objects = {}
+        self.batch_selection_objects = {}
 
     # -- Observer methods --
+    def graphical_object_changing(self, go):
+        self.history.object_changing(go)
+
     def graphical_object_changed(self, go):
-        self.notify_listeners()
+        if go in self.spatial_index:
+            self.spatial_index.update(go)
+            if self.shape_arrays is not None:
+                self.shape_arrays.update(go)
+        self.history.object_changed(go)
+        self.notify_object_changed(go)
 
     def graphical_object_selection_changed(self, go):
         if go.is_selected() and go not in self.selected_objects:
-            self.selected_objects.append(go)
+            self.selected_objects[go] = True
         elif not go.is_selected() and go in self.selected_objects:
-            self.selected_objects.remove(go)
+            del self.selected_objects[go]
         
-        self.notify_listeners()
+        self.notify_selection_changed(go)
 
     def add_document_model_listener(self, l):
         if l not in self.listeners:
@@ -33,9 +58,96 @@ class DocumentModel(GraphicalObjectListener):
             self.listeners.remove(l)
 
     def notify_listeners(self):
+        if self.batch_depth:
+            self.batch_document_changed = True
+            return
         for l in self.listeners:
             l.document_change()
 
+    def notify_view_invalidated(self):
+        # never batched or coalesced into document_change()
+        for l in self.listeners:
+            l.view_invalidated()
+
+    def notify_object_added(self, obj, index):
+        if self.batch_depth:
+            self.batch_structure_events.append((self.notify_object_added, (obj, index)))
+            return
+        for l in self.listeners:
+            l.object_added(obj, index)
+
+    def notify_object_removed(self, obj, index):
+        if self.batch_depth:
+            self.batch_structure_events.append((self.notify_object_removed, (obj, index)))
+            return
+        for l in self.listeners:
+            l.object_removed(obj, index)
+
+    def notify_object_changed(self, obj):
+        if self.batch_depth:
+            self.batch_changed_objects[obj] = True
+            return
+        for l in self.listeners:
+            l.object_changed(obj)
+
+    def notify_selection_changed(self, obj):
+        if self.batch_depth:
+            self.batch_selection_objects[obj] = True
+            return
+        for l in self.listeners:
+            l.selection_changed(obj)
+
+    def notify_z_order_changed(self, obj, old_index, new_index):
+        if self.batch_depth:
+            self.batch_structure_events.append((self.notify_z_order_changed, (obj, old_index, new_index)))
+            return
+        for l in self.listeners:
+            l.z_order_changed(obj, old_index, new_index)
+
+    # -- Batched mutations --
+    @contextmanager
+    def batch(self, coalesce_key=None):
+        # Notifications are held back until the outermost batch exits and
+        # the batch becomes one undo entry. Consecutive entries with the
+        # same coalesce_key (e.g. one drag gesture) are merged into one.
+        self.batch_depth += 1
+        self.history.begin_entry(coalesce_key)
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            self.history.end_entry()
+            if self.batch_depth == 0:
+                self.flush_batch()
+
+    def flush_batch(self):
+        document_changed = self.batch_document_changed
+        structure_events = self.batch_structure_events
+        changed_objects = self.batch_changed_objects
+        selection_objects = self.batch_selection_objects
+        self.batch_document_changed = False
+        self.batch_structure_events = []
+        self.batch_changed_objects = {}
+        self.batch_selection_objects = {}
+
+        # a few structural events are replayed as they happened, beyond
+        # that a single coarse event replaces all of them
+        if len(structure_events) > self.BATCH_REPLAY_LIMIT:
+            document_changed = True
+        if document_changed:
+            self.notify_listeners()
+        else:
+            for notify, args in structure_events:
+                notify(*args)
+
+        for obj in changed_objects:
+            if self.contains(obj):
+                self.notify_object_changed(obj)
+
+        if not document_changed:
+            for obj in selection_objects:
+                self.notify_selection_changed(obj)
+
     # --- Object management methods ---
     def clear(self):
         for obj in self.objects:
@@ -43,40 +155,101 @@ class DocumentModel(GraphicalObjectListener):
 
         self.objects.clear()
         self.selected_objects.clear()
+        self.spatial_index.clear()
+        if self.shape_arrays is not None:
+            self.shape_arrays.clear()
+        # a cleared document starts a new history
+        self.history.clear()
         self.notify_listeners()
 
-    def add_graphical_object(self, obj):
-        self.objects.append(obj)
+    def add_graphical_object(self, obj, index=None):
+        # index None adds on top, undo puts objects back where they were
+        if index is None:
+            index = len(self.objects)
+        self.objects.insert(index, obj)
+        index = self.objects.index(obj)
+        self.spatial_index.insert(obj)
+        if self.shape_arrays is not None:
+            self.shape_arrays.insert(obj)
         obj.add_graphical_object_listener(self)
         if obj.is_selected() and obj not in self.selected_objects:
-            self.selected_objects.append(obj)
-        self.notify_listeners()
+            self.selected_objects[obj] = True
+        self.history.record(('add', obj, index))
+        self.notify_object_added(obj, index)
 
     def remove_graphical_object(self, obj: AbstractGraphicalObject):
         if obj in self.objects:
             obj.remove_graphical_object_listener(self)
+            index = self.objects.index(obj)
             self.objects.remove(obj)
-            if obj in self.selected_objects:
-                self.selected_objects.remove(obj)
-            self.notify_listeners()
+            self.spatial_index.remove(obj)
+            if self.shape_arrays is not None:
+                self.shape_arrays.remove(obj)
+            self.selected_objects.pop(obj, None)
+            self.history.record(('remove', obj, index))
+            self.notify_object_removed(obj, index)
 
     def list(self):
         return list(self.objects)
 
+    def contains(self, obj):
+        return obj in self.objects
+
+    def get_bounding_box(self):
+        # bounds of the whole drawing, None when it is empty
+        return union_of_rectangles(obj.get_bounding_box() for obj in self.objects)
+
     # -- Selection methods --
     def get_selected_objects(self):
         return list(self.selected_objects)
 
+    def get_z_index(self, obj):
+        return self.objects.index(obj)
+
     def find_selected_graphical_object(self, mouse_point):
         min_dist = float('inf')
         selected_obj = None
-        for obj in self.objects:
-            dist = obj.selection_distance(mouse_point)
-            if dist < self.SELECTION_PROXIMITY and dist < min_dist:
+        candidates = list(self.spatial_index.query_point(mouse_point, self.SELECTION_PROXIMITY))
+        if self.shape_arrays is not None and len(candidates) >= self.VECTORIZE_THRESHOLD:
+            distances = self.shape_arrays.selection_distances(candidates, mouse_point)
+        else:
+            distances = [obj.selection_distance(mouse_point) for obj in candidates]
+
+        for obj, dist in zip(candidates, distances):
+            if dist >= self.SELECTION_PROXIMITY or dist > min_dist:
+                continue
+            # on a tie the lowest object in z-order wins, as with a full scan
+            if dist < min_dist or self.get_z_index(obj) < self.get_z_index(selected_obj):
                 min_dist = dist
                 selected_obj = obj
         return selected_obj
 
+    def find_graphical_objects_in_rect(self, rect):
+        # candidates only, callers still test the exact geometry
+        return self.spatial_index.query_rect(rect)
+
+    def find_graphical_objects_touching_path(self, points):
+        # objects the polyline through points really touches, each segment
+        # only tests the objects the spatial index finds around it
+        if len(points) == 1:
+            points = [points[0], points[0]]
+
+        found = {}
+        for i in range(len(points) - 1):
+            start, end = points[i], points[i + 1]
+            rect = segment_bounding_box(start, end)
+            candidates = [obj for obj in self.spatial_index.query_rect(rect) if obj not in found]
+            if self.shape_arrays is not None and len(candidates) >= self.VECTORIZE_THRESHOLD:
+                hits = self.shape_arrays.bboxes_intersect_rects(candidates, [rect])
+                candidates = [obj for obj, hit in zip(candidates, hits) if hit]
+            else:
+                candidates = [obj for obj in candidates if rectangles_intersect(obj.get_bounding_box(), rect)]
+
+            for obj in candidates:
+                if obj.intersects_segment(start, end):
+                    found[obj] = True
+        return list(found)
+
     def find_selected_hot_point(self, obj, mouse_point):
         min_dist = float('inf')
         selected_hp_index = -1
@@ -92,14 +265,21 @@ class DocumentModel(GraphicalObjectListener):
         if go in self.objects:
             index = self.objects.index(go)
             if index < len(self.objects) - 1:
-                self.objects.pop(index)
-                self.objects.insert(index + 1, go)
-                self.notify_listeners()
+                self.objects.swap(index, index + 1)
+                self.history.record(('z', go, index, index + 1))
+                self.notify_z_order_changed(go, index, index + 1)
 
     def decrease_z(self, go):
         if go in self.objects:
             index = self.objects.index(go)
             if index > 0:
-                self.objects.pop(index)
-                self.objects.insert(index - 1, go)
-                self.notify_listeners()
\ No newline at end of file
+                self.objects.swap(index, index - 1)
+                self.history.record(('z', go, index, index - 1))
+                self.notify_z_order_changed(go, index, index - 1)
+
+    # -- Undo/redo --
+    def undo(self):
+        return self.history.undo()
+
+    def redo(self):
+        return self.history.redo()
\ No newline at end of file
@@ -0,0 +1,93 @@
+# drawing_io.py
+# Headless reading and writing of drawings. Binary files (see
+# binary_drawing.py) are handled transparently, the text format has
+# one shape per row:
+#   @LINE x1 y1 x2 y2
+#   @OVAL x1 y1 x2 y2
+#   @COMP n   (groups the previous n shapes on the stack)
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.composite_shape import CompositeShape
+from .document_model import DocumentModel
+from .gc_pause import paused_gc
+from .format_error import DrawingFormatError
+from .binary_drawing import BinaryDrawing, is_binary_drawing, write_binary_drawing, BINARY_EXTENSION
+
+
+def create_prototype_map(prototypes=None):
+    if prototypes is None:
+        prototypes = [LineSegment(), Oval()]
+
+    prototype_map = {proto.get_shape_id(): proto for proto in prototypes}
+    prototype_map.setdefault('@COMP', CompositeShape([]))
+    return prototype_map
+
+
+def read_objects(rows, prototype_map=None):
+    # Streams rows (any iterable of lines, e.g. an open file) through the
+    # prototypes' load(stack, data) and returns the top-level objects.
+    # Nothing outside the returned list is touched, so a bad row can't
+    # leave a half-loaded document behind.
+    if prototype_map is None:
+        prototype_map = create_prototype_map()
+    loaders = {shape_id: proto.load for shape_id, proto in prototype_map.items()}
+
+    with paused_gc():
+        stack = []
+        for line_number, row in enumerate(rows, 1):
+            shape_id, _, data = row.strip().partition(' ')
+            if not shape_id:
+                continue
+
+            load = loaders.get(shape_id)
+            if load is None:
+                raise DrawingFormatError(f'Unknown shape ID: {shape_id}', line_number)
+            try:
+                load(stack, data)
+            except (ValueError, IndexError) as e:
+                raise DrawingFormatError(f'Invalid {shape_id} row: {e}', line_number) from e
+
+    return stack
+
+
+def read_drawing(file_path, prototype_map=None):
+    # binary drawings are recognized by their magic, not the extension.
+    # Every object is built here, open a BinaryDrawing to build them lazily.
+    if is_binary_drawing(file_path):
+        with BinaryDrawing(file_path) as drawing, paused_gc():
+            return list(drawing)
+
+    with open(file_path, 'r') as f:
+        return read_objects(f, prototype_map)
+
+
+def load_document(file_path, prototype_map=None):
+    # builds a complete DocumentModel without any GUI
+    objects = read_drawing(file_path, prototype_map)
+    model = DocumentModel()
+    with model.history.suspended(), model.batch():
+        for obj in objects:
+            model.add_graphical_object(obj)
+    return model
+
+
+def write_objects(file, objects):
+    # rows are written per object, the document is never joined in memory
+    separator = ''
+    for obj in objects:
+        rows = []
+        obj.save(rows)
+        for row in rows:
+            file.write(separator)
+            file.write(row)
+            separator = '\n'
+
+
+def write_drawing(file_path, objects):
+    if file_path.endswith(BINARY_EXTENSION):
+        write_binary_drawing(file_path, objects)
+        return
+
+    with open(file_path, 'w') as f, paused_gc():
+        write_objects(f, objects)
+
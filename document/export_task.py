@@ -0,0 +1,120 @@
+# export_task.py
+# Saves and exports running on a worker thread. The drawing is captured
+# on the UI thread as hot points only (see history.capture_geometry) and
+# the worker rebuilds detached copies from them, so editing can go on
+# meanwhile. Output goes to a temporary file that replaces the target once
+# complete; a cancelled or failed task leaves the target untouched.
+# Nothing here touches Tk, the UI polls progress() and finished.
+import os
+import threading
+from geometry.utils import union_of_rectangles
+from renderer.svg_renderer import SVGRenderer
+from renderer.raster_renderer import render_png
+from .binary_drawing import BINARY_EXTENSION, write_binary_drawing
+from .drawing_io import write_drawing
+from .gc_pause import paused_gc
+from .history import capture_geometry, copy_with_geometry
+
+
+class TaskCancelled(Exception):
+    pass
+
+
+class ExportTask:
+    KINDS = ('drawing', 'svg', 'png')  # write_drawing() formats, SVG/SVGZ, PNG
+
+    def __init__(self, objects, file_path, kind):
+        if kind not in self.KINDS:
+            raise ValueError(f'Unknown export kind: {kind}')
+        with paused_gc():
+            self.snapshot = [(obj, capture_geometry(obj)) for obj in objects]
+        self.file_path = file_path
+        # the extension is kept, it selects the output format
+        root, extension = os.path.splitext(file_path)
+        self.temp_path = f'{root}.partial{extension}'
+        self.kind = kind
+        # copying every object counts as much as writing it
+        self.total = 2 * len(self.snapshot)
+        self.done = 0
+        self.cancel_event = threading.Event()
+        self.cancelled = False
+        self.error = None
+        self.finished = False
+        self.thread = threading.Thread(target=self._run, name=f'{kind} export', daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def cancel(self):
+        # takes effect at the next object or tile
+        self.cancel_event.set()
+
+    def abandon(self, timeout):
+        # cancels without waiting for more than timeout seconds. The worker
+        # is a daemon and dies with the process, its partial file doesn't
+        self.cancel()
+        self.thread.join(timeout)
+        if self.thread.is_alive():
+            _remove_if_exists(self.temp_path)
+
+    def progress(self):
+        return self.done / self.total if self.total else 1.0
+
+    def _step(self, done):
+        if self.cancel_event.is_set():
+            raise TaskCancelled()
+        self.done = done
+
+    # -- Worker thread --
+    def _run(self):
+        temp_path = self.temp_path
+        try:
+            objects = []
+            for i, (obj, geometry) in enumerate(self.snapshot, 1):
+                self._step(i)
+                objects.append(copy_with_geometry(obj, geometry))
+            self.snapshot = None
+            self._write(objects, temp_path)
+            # a cancel that came in while the file was written still counts
+            self._step(self.total)
+            os.replace(temp_path, self.file_path)
+        except TaskCancelled:
+            self.cancelled = True
+        except Exception as e:  # reported to the UI
+            self.error = e
+        finally:
+            _remove_if_exists(temp_path)
+            self.finished = True
+
+    def _counted(self, objects):
+        # yields objects while counting them as written
+        for i, obj in enumerate(objects, 1):
+            self._step(len(objects) + i)
+            yield obj
+
+    def _write(self, objects, file_path):
+        if self.kind == 'svg':
+            view_box = union_of_rectangles(obj.get_bounding_box() for obj in objects)
+            with SVGRenderer(file_path, stream=True, view_box=view_box) as renderer:
+                for obj in self._counted(objects):
+                    obj.render(renderer)
+        elif self.kind == 'png':
+            def tile_done(done, total):
+                self._step(len(objects) + len(objects) * done // total)
+            render_png(objects, file_path, progress=tile_done)
+        elif file_path.endswith(BINARY_EXTENSION):
+            def encoded(done, total):
+                self._step(len(objects) + done)
+            write_binary_drawing(file_path, objects, progress=encoded)
+        else:
+            write_drawing(file_path, self._counted(objects))
+        self.done = self.total
+
+
+def _remove_if_exists(path):
+    # the worker and abandon() may both get here
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,11 @@
+# format_error.py
+# Raised for malformed drawings, text or binary. A ValueError, so callers
+# that only know about ValueError still catch it.
+
+
+class DrawingFormatError(ValueError):
+    def __init__(self, message, line_number=None):
+        if line_number is not None:
+            message = f'line {line_number}: {message}'
+        super().__init__(message)
+        self.line_number = line_number
@@ -0,0 +1,16 @@
+import gc
+from contextlib import contextmanager
+
+
+@contextmanager
+def paused_gc():
+    # Bulk loads and saves touch millions of long-lived objects without
+    # creating garbage cycles, yet every full collection would rescan
+    # all of them. The previous collector state is restored on exit.
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
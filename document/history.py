@@ -0,0 +1,241 @@
+# history.py
+# Undo/redo for a DocumentModel. An entry is a list of deltas, never a
+# snapshot of the document:
+#   ('add', obj, index)           ('remove', obj, index)
+#   ('z', obj, old_index, new_index)
+#   ('geometry', obj, before, after)
+# Geometry is a tuple of (leaf, hot points) pairs captured right before
+# an object first changes within the entry, so undoing or redoing costs
+# O(size of the entry) whatever the size of the document.
+from collections import deque
+from contextlib import contextmanager
+from geometry.composite_shape import CompositeShape
+
+
+def capture_geometry(obj):
+    leaves = obj.get_leaves() if isinstance(obj, CompositeShape) else [obj]
+    return tuple((leaf, tuple(leaf.hot_points)) for leaf in leaves)
+
+
+def copy_with_geometry(obj, geometry):
+    # a detached duplicate of obj as it was when geometry was captured,
+    # groups never change their structure, only the hot points move
+    copy = obj.duplicate()
+    leaves = copy.get_leaves() if isinstance(copy, CompositeShape) else [copy]
+    for leaf, (_, points) in zip(leaves, geometry):
+        leaf.set_hot_points(points)
+    return copy
+
+
+def restore_geometry(obj, geometry):
+    points = dict(geometry)
+
+    def restore(leaf):
+        if leaf in points and tuple(leaf.hot_points) != points[leaf]:
+            leaf.set_hot_points(points[leaf])
+
+    # a group is restored with a single change notification
+    if isinstance(obj, CompositeShape):
+        obj.apply_to_leaves(restore)
+    else:
+        restore(obj)
+
+
+class HistoryEntry:
+    def __init__(self, coalesce_key=None):
+        self.deltas = []
+        self.geometry = {}  # obj -> position of its geometry delta
+        self.coalesce_key = coalesce_key
+        self.cost = 0
+
+    def capture(self, obj):
+        if obj not in self.geometry:
+            self.geometry[obj] = len(self.deltas)
+            self.deltas.append(['geometry', obj, capture_geometry(obj), None])
+
+    def finish(self):
+        # fills in the geometry after the change and drops no-op deltas
+        deltas = []
+        self.geometry = {}
+        for delta in self.deltas:
+            if delta[0] == 'geometry':
+                delta[3] = capture_geometry(delta[1])
+                if delta[3] == delta[2]:
+                    continue
+                self.geometry[delta[1]] = len(deltas)
+            deltas.append(delta)
+        self.deltas = deltas
+        self.cost = sum(self.delta_cost(delta) for delta in deltas)
+
+    def merge(self, later):
+        # later moves of the same objects only replace the final geometry
+        if any(delta[0] != 'geometry' for delta in later.deltas):
+            offset = len(self.deltas)
+            self.deltas.extend(later.deltas)
+            for obj, position in later.geometry.items():
+                self.geometry.setdefault(obj, offset + position)
+            self.cost += later.cost
+        else:
+            for delta in later.deltas:
+                position = self.geometry.get(delta[1])
+                if position is None:
+                    self.geometry[delta[1]] = len(self.deltas)
+                    self.deltas.append(delta)
+                    self.cost += self.delta_cost(delta)
+                else:
+                    earlier = self.deltas[position]
+                    self.cost -= self.delta_cost(earlier)
+                    earlier[3] = delta[3]
+                    self.cost += self.delta_cost(earlier)
+
+    @staticmethod
+    def delta_cost(delta):
+        # roughly the number of references the delta keeps alive
+        if delta[0] == 'geometry':
+            return 1 + sum(len(points) for _, points in delta[2]) + sum(len(points) for _, points in delta[3])
+        if delta[0] in ('add', 'remove'):
+            # the whole object, a big group as much as its captured geometry
+            obj = delta[1]
+            leaves = obj.get_leaves() if isinstance(obj, CompositeShape) else [obj]
+            return 1 + sum(len(leaf.hot_points) for leaf in leaves)
+        return 1
+
+
+class CommandHistory:
+    MAX_ENTRIES = 1000
+    MAX_COST = 1000000  # stored hot points and deltas over both stacks
+
+    def __init__(self, model, max_entries=None, max_cost=None):
+        self.model = model
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.max_cost = max_cost or self.MAX_COST
+        self.undo_stack = deque()
+        self.redo_stack = []
+        self.cost = 0
+        self.entry = None
+        self.entry_depth = 0
+        self.suspend_depth = 0
+
+    def can_undo(self):
+        return bool(self.undo_stack)
+
+    def can_redo(self):
+        return bool(self.redo_stack)
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.cost = 0
+        if self.entry is not None:
+            self.entry = HistoryEntry(self.entry.coalesce_key)
+
+    @contextmanager
+    def suspended(self):
+        # mutations made inside are not recorded
+        self.suspend_depth += 1
+        try:
+            yield self
+        finally:
+            self.suspend_depth -= 1
+
+    # -- Recording, called by DocumentModel --
+    def begin_entry(self, coalesce_key=None):
+        if self.suspend_depth:
+            return
+        self.entry_depth += 1
+        if self.entry_depth == 1:
+            self.entry = HistoryEntry(coalesce_key)
+
+    def end_entry(self):
+        if self.suspend_depth:
+            return
+        self.entry_depth -= 1
+        if self.entry_depth == 0:
+            self._commit()
+
+    def record(self, delta):
+        if self.suspend_depth:
+            return
+        if self.entry is None:
+            self.entry = HistoryEntry()
+            self.entry.deltas.append(delta)
+            self._commit()
+        else:
+            self.entry.deltas.append(delta)
+
+    def object_changing(self, obj):
+        if self.suspend_depth:
+            return
+        if self.entry is None:
+            # a change outside any batch becomes an entry of its own,
+            # committed by the matching object_changed()
+            self.entry = HistoryEntry()
+        self.entry.capture(obj)
+
+    def object_changed(self, obj):
+        if self.entry is not None and self.entry_depth == 0 and not self.suspend_depth:
+            self._commit()
+
+    def _commit(self):
+        entry = self.entry
+        self.entry = None
+        entry.finish()
+        if not entry.deltas:
+            return
+
+        for redone in self.redo_stack:
+            self.cost -= redone.cost
+        self.redo_stack.clear()
+
+        previous = self.undo_stack[-1] if self.undo_stack else None
+        if (entry.coalesce_key is not None and previous is not None
+                and previous.coalesce_key == entry.coalesce_key):
+            self.cost -= previous.cost
+            previous.merge(entry)
+            self.cost += previous.cost
+        else:
+            self.undo_stack.append(entry)
+            self.cost += entry.cost
+        self._trim()
+
+    def _trim(self):
+        # the newest entry is always kept, even when it alone is over budget
+        while len(self.undo_stack) > 1 and (len(self.undo_stack) > self.max_entries
+                                            or self.cost > self.max_cost):
+            self.cost -= self.undo_stack.popleft().cost
+
+    # -- Undo and redo --
+    def undo(self):
+        if not self.undo_stack or self.entry is not None:
+            return False
+        entry = self.undo_stack.pop()
+        self._apply(reversed(entry.deltas), undo=True)
+        self.redo_stack.append(entry)
+        return True
+
+    def redo(self):
+        if not self.redo_stack or self.entry is not None:
+            return False
+        entry = self.redo_stack.pop()
+        self._apply(entry.deltas, undo=False)
+        self.undo_stack.append(entry)
+        return True
+
+    def _apply(self, deltas, undo):
+        model = self.model
+        with self.suspended(), model.batch():
+            for delta in deltas:
+                kind, obj = delta[0], delta[1]
+                if kind == 'geometry':
+                    restore_geometry(obj, delta[2] if undo else delta[3])
+                elif kind == 'z':
+                    # z deltas are always a swap with a neighbour
+                    target = delta[2] if undo else delta[3]
+                    if target > model.get_z_index(obj):
+                        model.increase_z(obj)
+                    else:
+                        model.decrease_z(obj)
+                elif (kind == 'add') == undo:
+                    model.remove_graphical_object(obj)
+                else:
+                    model.add_graphical_object(obj, delta[2])
@@ -0,0 +1,167 @@
+# preview_cache.py
+# On-disk cache of drawing previews (PNG thumbnails or SVG). Previews are
+# keyed by a hash of the drawing's save rows, so identical drawings share
+# one preview whatever file or format they were stored in. Files that were
+# hashed before are remembered by (size, mtime), which lets an unchanged
+# drawing be served without reading or parsing it at all. The directory is
+# kept under max_bytes by evicting the least recently used previews.
+import hashlib
+import json
+import os
+from collections import OrderedDict
+from .drawing_io import read_drawing
+from geometry.utils import union_of_rectangles
+from renderer.raster_renderer import fit_viewport, render_png
+from renderer.svg_renderer import SVGRenderer
+
+PREVIEW_EXTENSIONS = {'png': '.png', 'svg': '.svg'}
+
+
+def content_hash(objects):
+    # rows are hashed one object at a time, like write_objects() writes them
+    digest = hashlib.blake2b(digest_size=16)
+    for obj in objects:
+        rows = []
+        obj.save(rows)
+        for row in rows:
+            digest.update(row.encode())
+            digest.update(b'\n')
+    return digest.hexdigest()
+
+
+class PreviewCache:
+    MAX_BYTES = 32 * 1024 * 1024
+    PREVIEW_SIZE = 256  # longest side of a PNG preview, in pixels
+    INDEX_NAME = 'index.json'
+
+    def __init__(self, directory, max_bytes=None, preview_format='png', size=None):
+        self.directory = directory
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.extension = PREVIEW_EXTENSIONS[preview_format]
+        self.size = size or self.PREVIEW_SIZE
+        self.previews = OrderedDict()  # file name -> bytes, least recently used first
+        self.files = {}  # drawing path -> [size, mtime_ns, content hash]
+        self.total_bytes = 0
+        self.index_dirty = False
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        # hits only reorder the LRU, that is written once here
+        if self.index_dirty:
+            self._save_index()
+
+    # -- Lookups --
+    def preview_for_file(self, file_path):
+        # path of the preview for a saved drawing, rendered on a miss
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        known = self.files.get(file_path)
+        if known is not None and known[:2] == [stat.st_size, stat.st_mtime_ns]:
+            path = self._hit(known[2])
+            if path is not None:
+                return path
+
+        objects = read_drawing(file_path)
+        key = content_hash(objects)
+        self.files[file_path] = [stat.st_size, stat.st_mtime_ns, key]
+        return self._hit(key) or self._store(key, objects)
+
+    def preview_for_document(self, model):
+        objects = model.list()
+        key = content_hash(objects)
+        return self._hit(key) or self._store(key, objects)
+
+    def _name(self, key):
+        return f'{key}_{self.size}{self.extension}'
+
+    def _hit(self, key):
+        name = self._name(key)
+        if name not in self.previews:
+            return None
+        path = os.path.join(self.directory, name)
+        if not os.path.exists(path):
+            # deleted behind our back
+            self.total_bytes -= self.previews.pop(name)
+            self.index_dirty = True
+            return None
+        self.previews.move_to_end(name)
+        self.index_dirty = True
+        return path
+
+    # -- Rendering and eviction --
+    def _store(self, key, objects):
+        name = self._name(key)
+        path = os.path.join(self.directory, name)
+        temp_path = path + '.tmp'
+        self._render(objects, temp_path)
+        os.replace(temp_path, path)  # readers never see a half-written preview
+
+        self.previews[name] = os.path.getsize(path)
+        self.total_bytes += self.previews[name]
+        self._evict()
+        self._save_index()
+        return path
+
+    def _render(self, objects, file_path):
+        if self.extension == '.svg':
+            view_box = union_of_rectangles(obj.get_bounding_box() for obj in objects)
+            with SVGRenderer(file_path, stream=True, view_box=view_box) as renderer:
+                for obj in objects:
+                    obj.render(renderer)
+            return
+
+        # fits the longer side of the drawing to size
+        viewport, width, height = fit_viewport(objects, self.size)
+        if height > self.size:
+            viewport, width, height = fit_viewport(objects, height=self.size)
+        render_png(objects, file_path, width, height, viewport, antialias=True)
+
+    def _evict(self):
+        # the newest preview is always kept, even when it alone is too big
+        evicted = set()
+        while len(self.previews) > 1 and self.total_bytes > self.max_bytes:
+            name, size = self.previews.popitem(last=False)
+            self.total_bytes -= size
+            evicted.add(name)
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+        if evicted:
+            self.files = {path: known for path, known in self.files.items()
+                          if self._name(known[2]) not in evicted}
+
+    # -- Index --
+    def _index_path(self):
+        return os.path.join(self.directory, self.INDEX_NAME)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r') as f:
+                index = json.load(f)
+            previews = index['previews']
+            files = index['files']
+        except (OSError, ValueError, KeyError, TypeError):
+            return  # missing or unreadable index, start empty
+
+        for name, size in previews:
+            if os.path.exists(os.path.join(self.directory, name)):
+                self.previews[name] = size
+                self.total_bytes += size
+        self.files = files
+
+    def _save_index(self):
+        index = {'previews': list(self.previews.items()), 'files': self.files}
+        temp_path = self._index_path() + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(index, f)
+        os.replace(temp_path, self._index_path())
+        self.index_dirty = False
@@ -0,0 +1,186 @@
+try:
+    import numpy as np
+except ImportError:  # the model falls back to per-object tests
+    np = None
+
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.composite_shape import CompositeShape
+
+HAS_NUMPY = np is not None
+
+
+class ShapeArrays:
+    # Contiguous NumPy copies of the document geometry:
+    #  - one bounding box row per top-level object,
+    #  - one (x1, y1, x2, y2) row per line/oval leaf, with its kind.
+    # Rows are recycled through free lists, so updates never shift arrays.
+    # Objects with leaves of any other type are tested in Python.
+    LINE = 0
+    OVAL = 1
+    INITIAL_CAPACITY = 1024
+    MAX_CHUNK_CELLS = 1 << 20  # bounds the objects x rects test matrix
+
+    def __init__(self):
+        self.clear()
+
+    def __contains__(self, obj):
+        return obj in self.object_slots
+
+    def clear(self):
+        self.bboxes = np.zeros((self.INITIAL_CAPACITY, 4))
+        self.free_slots = []
+        self.slot_count = 0
+        self.object_slots = {}  # object -> bbox row
+
+        self.leaves = np.zeros((self.INITIAL_CAPACITY, 4))
+        self.leaf_kinds = np.zeros(self.INITIAL_CAPACITY, dtype=np.int8)
+        self.free_leaves = []
+        self.leaf_count = 0
+        self.object_leaves = {}  # object -> list of leaf rows, None if not vectorizable
+
+    # -- Store maintenance --
+    def insert(self, obj):
+        if obj in self.object_slots:
+            self.remove(obj)
+
+        slot = self._allocate_slot()
+        bbox = obj.get_bounding_box()
+        self.bboxes[slot] = (bbox.x, bbox.y, bbox.width, bbox.height)
+        self.object_slots[obj] = slot
+        self.object_leaves[obj] = self._store_leaves(obj)
+
+    def remove(self, obj):
+        slot = self.object_slots.pop(obj, None)
+        if slot is None:
+            return
+
+        self.free_slots.append(slot)
+        rows = self.object_leaves.pop(obj)
+        if rows:
+            self.free_leaves.extend(rows)
+
+    def update(self, obj):
+        self.insert(obj)
+
+    # -- Batch queries --
+    def selection_distances(self, objects, mouse_point):
+        # returns one selection distance per object, in the given order
+        result = np.full(len(objects), np.inf)
+        rows = []
+        owners = []
+        for i, obj in enumerate(objects):
+            obj_rows = self.object_leaves.get(obj)
+            if obj_rows is None:
+                result[i] = obj.selection_distance(mouse_point)
+            else:
+                rows.extend(obj_rows)
+                owners.extend([i] * len(obj_rows))
+
+        if rows:
+            rows = np.asarray(rows)
+            distances = self._leaf_distances(self.leaves[rows], self.leaf_kinds[rows], mouse_point)
+            np.minimum.at(result, np.asarray(owners), distances)
+        return result
+
+    def bboxes_intersect_rects(self, objects, rects):
+        # returns one flag per object: does its bounding box touch any rect
+        hits = np.zeros(len(objects), dtype=bool)
+        if not objects or not rects:
+            return hits
+
+        slots = np.fromiter((self.object_slots[obj] for obj in objects), dtype=np.intp, count=len(objects))
+        rect_array = np.array([(r.x, r.y, r.x + r.width, r.y + r.height) for r in rects])
+        chunk = max(1, self.MAX_CHUNK_CELLS // len(rects))
+
+        for start in range(0, len(objects), chunk):
+            boxes = self.bboxes[slots[start:start + chunk]]
+            min_x = boxes[:, 0:1]
+            min_y = boxes[:, 1:2]
+            max_x = min_x + boxes[:, 2:3]
+            max_y = min_y + boxes[:, 3:4]
+            apart = ((max_x < rect_array[:, 0]) | (min_x > rect_array[:, 2]) |
+                     (max_y < rect_array[:, 1]) | (min_y > rect_array[:, 3]))
+            hits[start:start + chunk] = ~apart.all(axis=1)
+        return hits
+
+    # -- Kernels, mirroring LineSegment and Oval selection_distance --
+    def _leaf_distances(self, coords, kinds, p):
+        distances = np.empty(len(coords))
+
+        lines = kinds == self.LINE
+        if lines.any():
+            distances[lines] = self._line_distances(coords[lines], p)
+
+        ovals = ~lines
+        if ovals.any():
+            distances[ovals] = self._oval_distances(coords[ovals], p)
+        return distances
+
+    def _line_distances(self, coords, p):
+        x1, y1, x2, y2 = coords.T
+        dx = x2 - x1
+        dy = y2 - y1
+        length_squared = dx * dx + dy * dy
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t = ((p.x - x1) * dx + (p.y - y1) * dy) / length_squared
+        # zero-length segments and points before the start snap to the start
+        t = np.where(length_squared == 0, 0.0, np.clip(t, 0.0, 1.0))
+
+        return np.hypot(x1 + t * dx - p.x, y1 + t * dy - p.y)
+
+    def _oval_distances(self, coords, p):
+        x1, y1, x2, y2 = coords.T
+        radius_x = np.abs(x2 - x1) / 2
+        radius_y = np.abs(y2 - y1) / 2
+        dx = p.x - (np.minimum(x1, x2) + radius_x)
+        dy = p.y - (np.minimum(y1, y2) + radius_y)
+        center_distance = np.hypot(dx, dy)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            value = (dx / radius_x) ** 2 + (dy / radius_y) ** 2
+            outside = center_distance - (radius_x * radius_y) / np.hypot(radius_y * dx, radius_x * dy)
+
+        degenerate = (radius_x == 0) | (radius_y == 0)
+        return np.where(degenerate, center_distance, np.where(value <= 1, 0.0, outside))
+
+    # -- Row allocation --
+    def _store_leaves(self, obj):
+        leaves = []
+        stack = [obj]
+        while stack:
+            go = stack.pop()
+            if isinstance(go, (LineSegment, Oval)):
+                leaves.append(go)
+            elif isinstance(go, CompositeShape):
+                stack.extend(go.children)
+            else:
+                return None
+
+        rows = []
+        for leaf in leaves:
+            row = self._allocate_leaf()
+            p1 = leaf.get_hot_point(0)
+            p2 = leaf.get_hot_point(1)
+            self.leaves[row] = (p1.x, p1.y, p2.x, p2.y)
+            self.leaf_kinds[row] = self.LINE if isinstance(leaf, LineSegment) else self.OVAL
+            rows.append(row)
+        return rows
+
+    def _allocate_slot(self):
+        if self.free_slots:
+            return self.free_slots.pop()
+        if self.slot_count == len(self.bboxes):
+            self.bboxes = np.resize(self.bboxes, (2 * len(self.bboxes), 4))
+        self.slot_count += 1
+        return self.slot_count - 1
+
+    def _allocate_leaf(self):
+        if self.free_leaves:
+            return self.free_leaves.pop()
+        if self.leaf_count == len(self.leaves):
+            self.leaves = np.resize(self.leaves, (2 * len(self.leaves), 4))
+            self.leaf_kinds = np.resize(self.leaf_kinds, 2 * len(self.leaf_kinds))
+        self.leaf_count += 1
+        return self.leaf_count - 1
@@ -0,0 +1,90 @@
+import math
+from geometry.rectangle import Rectangle
+
+
+class SpatialIndex:
+    # Uniform grid over the bounding boxes of graphical objects.
+    # Objects covering too many cells are kept in a separate bucket
+    # that every query returns, so huge shapes don't flood the grid.
+    CELL_SIZE = 64.0
+    MAX_CELLS_PER_OBJECT = 256
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}  # (column, row) -> set of objects
+        self.object_cells = {}  # object -> list of cell keys
+        self.oversized = set()
+
+    def __len__(self):
+        return len(self.object_cells)
+
+    def __contains__(self, obj):
+        return obj in self.object_cells
+
+    # -- Index maintenance --
+    def insert(self, obj):
+        if obj in self.object_cells:
+            self.remove(obj)
+
+        keys = self._cells_for_rect(obj.get_bounding_box())
+        if keys is None:
+            self.oversized.add(obj)
+            self.object_cells[obj] = []
+            return
+
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket is None:
+                bucket = self.cells[key] = set()
+            bucket.add(obj)
+        self.object_cells[obj] = keys
+
+    def remove(self, obj):
+        keys = self.object_cells.pop(obj, None)
+        if keys is None:
+            return
+
+        self.oversized.discard(obj)
+        for key in keys:
+            bucket = self.cells[key]
+            bucket.discard(obj)
+            if not bucket:
+                del self.cells[key]
+
+    def update(self, obj):
+        self.insert(obj)
+
+    def clear(self):
+        self.cells.clear()
+        self.object_cells.clear()
+        self.oversized.clear()
+
+    # -- Queries --
+    def query_rect(self, rect):
+        # returns candidates whose cells overlap rect, callers do the exact test
+        result = set(self.oversized)
+        keys = self._cells_for_rect(rect)
+        if keys is None:
+            keys = self.cells.keys()
+
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket:
+                result.update(bucket)
+        return result
+
+    def query_point(self, p, radius=0.0):
+        return self.query_rect(Rectangle(p.x - radius, p.y - radius, 2 * radius, 2 * radius))
+
+    def _cells_for_rect(self, rect):
+        min_col = math.floor(rect.x / self.cell_size)
+        min_row = math.floor(rect.y / self.cell_size)
+        max_col = math.floor((rect.x + rect.width) / self.cell_size)
+        max_row = math.floor((rect.y + rect.height) / self.cell_size)
+
+        if (max_col - min_col + 1) * (max_row - min_row + 1) > self.MAX_CELLS_PER_OBJECT:
+            return None
+
+        return [(col, row)
+                for col in range(min_col, max_col + 1)
+                for row in range(min_row, max_row + 1)]
@@ -0,0 +1,124 @@
+class ZOrderList:
+    # Ordered container of graphical objects (bottom to top).
+    # Removed objects leave a hole that a Fenwick tree over the slots
+    # skips, which gives O(1) membership and O(log N) index/swap.
+    # Holes are compacted once they outnumber the live objects.
+    MIN_COMPACT_HOLES = 32
+
+    def __init__(self, objects=()):
+        self.clear()
+        for obj in objects:
+            self.append(obj)
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, obj):
+        return obj in self.positions
+
+    def __iter__(self):
+        return (obj for obj in self.slots if obj is not None)
+
+    def __getitem__(self, index):
+        return self.slots[self._slot_at(self._normalize(index))]
+
+    def clear(self):
+        self.slots = []
+        self.positions = {}  # object -> slot
+        self.tree = [0]  # 1-based Fenwick tree over slot occupancy
+        self.holes = 0
+
+    def append(self, obj):
+        if obj in self.positions:
+            raise ValueError('Object is already in the list')
+
+        self.slots.append(obj)
+        self.positions[obj] = len(self.slots) - 1
+
+        # new node covers (i - lowbit(i), i]
+        i = len(self.slots)
+        self.tree.append(1 + self._prefix(i - 1) - self._prefix(i - (i & -i)))
+
+    def insert(self, index, obj):
+        if index >= len(self.positions):
+            self.append(obj)
+            return
+        if obj in self.positions:
+            raise ValueError('Object is already in the list')
+
+        # a hole right below the current occupant (e.g. the one left by
+        # removing obj) is reused in O(log N), anything else rebuilds
+        slot = self._slot_at(self._normalize(index))
+        if slot > 0 and self.slots[slot - 1] is None:
+            self.slots[slot - 1] = obj
+            self.positions[obj] = slot - 1
+            self._add(slot - 1, 1)
+            self.holes -= 1
+            return
+
+        objects = list(self)
+        objects.insert(index, obj)
+        self.clear()
+        for o in objects:
+            self.append(o)
+
+    def remove(self, obj):
+        slot = self.positions.pop(obj)
+        self.slots[slot] = None
+        self._add(slot, -1)
+        self.holes += 1
+
+        if self.holes > self.MIN_COMPACT_HOLES and self.holes > len(self.positions):
+            self._compact()
+
+    def index(self, obj):
+        return self._prefix(self.positions[obj] + 1) - 1
+
+    def swap(self, index_a, index_b):
+        slot_a = self._slot_at(self._normalize(index_a))
+        slot_b = self._slot_at(self._normalize(index_b))
+        obj_a, obj_b = self.slots[slot_a], self.slots[slot_b]
+
+        self.slots[slot_a], self.slots[slot_b] = obj_b, obj_a
+        self.positions[obj_a], self.positions[obj_b] = slot_b, slot_a
+
+    # -- Fenwick tree helpers --
+    def _normalize(self, index):
+        if index < 0:
+            index += len(self.positions)
+        if not 0 <= index < len(self.positions):
+            raise IndexError('Z-order index out of range')
+        return index
+
+    def _prefix(self, i):
+        # number of live slots among the first i slots
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def _add(self, slot, delta):
+        i = slot + 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def _slot_at(self, index):
+        # descend the tree to the slot holding the (index + 1)-th live object
+        pos = 0
+        remaining = index + 1
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            nxt = pos + step
+            if nxt < len(self.tree) and self.tree[nxt] < remaining:
+                pos = nxt
+                remaining -= self.tree[nxt]
+            step >>= 1
+        return pos
+
+    def _compact(self):
+        objects = list(self)
+        self.clear()
+        for obj in objects:
+            self.append(obj)
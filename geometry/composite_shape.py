@@ -1,70 +1,149 @@
 from .graphical_object import AbstractGraphicalObject
 from .point import Point
 from .rectangle import Rectangle
+from .utils import rectangles_intersect, segment_bounding_box, union_of_rectangles
 from listeners.graphical_object.graphical_object_listener import GraphicalObjectListener
 
 
 class CompositeShape(AbstractGraphicalObject, GraphicalObjectListener):
+    # Groups can nest arbitrarily deep, so every traversal below uses an
+    # explicit stack instead of recursing into children.
     def __init__(self, children):
         super().__init__([])
         self.children = children
+        self.notifications_muted = False  # set while apply_to_leaves() runs
         for child in children:
             child.add_graphical_object_listener(self)
 
     def get_children(self):
         return list(self.children)
-    
+
+    def get_leaves(self):
+        return self._collect()[1]
+
+    def _collect(self):
+        # (composites, leaves) of the whole tree, both in pre-order
+        composites = []
+        leaves = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, CompositeShape):
+                composites.append(node)
+                stack.extend(reversed(node.children))
+            else:
+                leaves.append(node)
+        return composites, leaves
+
+    def apply_to_leaves(self, function):
+        # Runs function on every leaf with change notifications muted inside
+        # the group, then sends a single one for the whole composite.
+        composites, leaves = self._collect()
+        self.notify_changing()
+        for composite in composites:
+            composite.notifications_muted = True
+        try:
+            for leaf in leaves:
+                function(leaf)
+        finally:
+            for composite in composites:
+                composite.notifications_muted = False
+                composite.cached_bounding_box = None
+        self.notify_changed()
+
     # -- delegate methods to children --
     def render(self, renderer):
-        for child in self.children:
-            child.render(renderer)
+        for leaf in self.get_leaves():
+            leaf.render(renderer)
 
     def translate(self, dp):
-        for child in self.children:
-            child.translate(dp)
-        # dont call notify_changed(), since every child will call it
+        self.apply_to_leaves(lambda leaf: leaf.translate(dp))
+
+    def compute_bounding_box(self):
+        # nested boxes that aren't cached yet are filled in bottom-up
+        pending = []
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            pending.append(node)
+            for child in node.children:
+                if isinstance(child, CompositeShape) and child.cached_bounding_box is None:
+                    stack.append(child)
 
-    def get_bounding_box(self):
+        # children always come after their parent in pending
+        for node in reversed(pending[1:]):
+            node.cached_bounding_box = node._children_bounding_box()
+        return self._children_bounding_box()
+
+    def _children_bounding_box(self):
         if not self.children:
             return Rectangle(0, 0, 0, 0)
-        
-        bbox = self.children[0].get_bounding_box()
-        min_x, min_y = bbox.x, bbox.y
-        max_x, max_y = bbox.x + bbox.width, bbox.y + bbox.height
-
-        for i in range(1, len(self.children)):
-            child_bbox = self.children[i].get_bounding_box()
-            min_x = min(min_x, child_bbox.x)
-            min_y = min(min_y, child_bbox.y)
-            max_x = max(max_x, child_bbox.x + child_bbox.width)
-            max_y = max(max_y, child_bbox.y + child_bbox.height)
-
-        return Rectangle(min_x, min_y, max_x - min_x, max_y - min_y)
-    
+        return union_of_rectangles(child.get_bounding_box() for child in self.children)
+
     def get_shape_name(self):
         return 'Composite Shape'
-    
+
     def duplicate(self):
-        new_children = [child.duplicate() for child in self.children]
-        new_shape = CompositeShape(new_children)
-        return new_shape
-    
+        # copies bottom-up, each group collects its already copied children
+        copies = []
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not isinstance(node, CompositeShape):
+                copies.append(node.duplicate())
+            elif expanded:
+                first = len(copies) - len(node.children)
+                children = copies[first:]
+                del copies[first:]
+                copies.append(CompositeShape(children))
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
+        return copies[0]
+
+    def graphical_object_changing(self, go):
+        if not self.notifications_muted:
+            self.notify_changing()
+
     def graphical_object_changed(self, go):
-        self.notify_changed()
+        if not self.notifications_muted:
+            self.notify_changed()
 
     def graphical_object_selection_changed(self, go):
         self.notify_selection_changed()
 
     def selection_distance(self, mouse_point):
-        return min(child.selection_distance(mouse_point) for child in self.children)
-    
+        return min((leaf.selection_distance(mouse_point) for leaf in self.get_leaves()), default=float('inf'))
+
+    def intersects_segment(self, start, end):
+        # skips subtrees the segment can't reach
+        rect = segment_bounding_box(start, end)
+        stack = list(self.children)
+        while stack:
+            node = stack.pop()
+            if not rectangles_intersect(node.get_bounding_box(), rect):
+                continue
+            if isinstance(node, CompositeShape):
+                stack.extend(node.children)
+            elif node.intersects_segment(start, end):
+                return True
+        return False
+
     def get_shape_id(self):
         return '@COMP'
-    
+
     def save(self, rows):
-        for child in self.children:
-            child.save(rows)
-        rows.append(f'{self.get_shape_id()} {len(self.children)}')
+        # post-order: children rows first, then the group row
+        stack = [(self, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if not isinstance(node, CompositeShape):
+                node.save(rows)
+            elif expanded:
+                rows.append(f'{node.get_shape_id()} {len(node.children)}')
+            else:
+                stack.append((node, True))
+                stack.extend((child, False) for child in reversed(node.children))
 
     def load(self, stack, data):
         num_children = int(data)
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
 from .point import Point
-from .utils import distance_from_point, distance_from_line_segment
+from .utils import distance_from_point, distance_from_line_segment, rectangles_intersect, segment_bounding_box
 
 
 class AbstractGraphicalObject(ABC):
@@ -9,6 +9,7 @@ class AbstractGraphicalObject(ABC):
         self.hot_points_selected = [False] * len(hot_points)
         self.selected = False
         self.listeners = []
+        self.cached_bounding_box = None
 
     # -- Object edit methods --
     def is_selected(self):
@@ -28,6 +29,7 @@ class AbstractGraphicalObject(ABC):
 
     def set_hot_point(self, index: int, p: Point):
         if 0 <= index < len(self.hot_points):
+            self.notify_changing()
             self.hot_points[index] = p
             self.notify_changed()
         else:
@@ -51,19 +53,36 @@ class AbstractGraphicalObject(ABC):
         raise IndexError('Hot point index out of range')
 
     # -- Geometric operations on shape --
+    def set_hot_points(self, points):
+        # replaces every hot point with a single notification
+        self.notify_changing()
+        self.hot_points[:] = points
+        self.notify_changed()
+
     def translate(self, dp: Point):
+        self.notify_changing()
         for i in range(len(self.hot_points)):
             self.hot_points[i] = self.hot_points[i].translate(dp)
         self.notify_changed()
 
-    @abstractmethod
     def get_bounding_box(self):
+        # cached until the next notify_changed()
+        if self.cached_bounding_box is None:
+            self.cached_bounding_box = self.compute_bounding_box()
+        return self.cached_bounding_box
+
+    @abstractmethod
+    def compute_bounding_box(self):
         pass
 
     @abstractmethod
     def selection_distance(self, mouse_point: Point) -> float:
         pass
 
+    def intersects_segment(self, start: Point, end: Point) -> bool:
+        # shapes override this with an exact test, the bounding box is a safe default
+        return rectangles_intersect(self.get_bounding_box(), segment_bounding_box(start, end))
+
     # -- Drawing methods (bridge pattern) --
     @abstractmethod
     def render(self, renderer):
@@ -78,7 +97,12 @@ class AbstractGraphicalObject(ABC):
         if listener in self.listeners:
             self.listeners.remove(listener)
 
+    def notify_changing(self):
+        for listener in self.listeners:
+            listener.graphical_object_changing(self)
+
     def notify_changed(self):
+        self.cached_bounding_box = None
         for listener in self.listeners:
             listener.graphical_object_changed(self)
 
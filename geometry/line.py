@@ -1,7 +1,7 @@
 from .graphical_object import AbstractGraphicalObject
 from .point import Point
 from .rectangle import Rectangle
-from .utils import distance_from_line_segment
+from .utils import distance_from_line_segment, segments_intersect
 
 
 class LineSegment(AbstractGraphicalObject):
@@ -14,8 +14,11 @@ class LineSegment(AbstractGraphicalObject):
         start = self.get_hot_point(0)
         end = self.get_hot_point(1)
         return distance_from_line_segment(start, end, mouse_point)
+
+    def intersects_segment(self, start, end):
+        return segments_intersect(self.get_hot_point(0), self.get_hot_point(1), start, end)
     
-    def get_bounding_box(self):
+    def compute_bounding_box(self):
         start = self.get_hot_point(0)
         end = self.get_hot_point(1)
         
@@ -52,12 +55,10 @@ class LineSegment(AbstractGraphicalObject):
         rows.append(f'{self.get_shape_id()} {start.x} {start.y} {end.x} {end.y}')
 
     def load(self, stack, data):
-        parts = data.split()
-        if len(parts) != 4:
-            raise ValueError(f'Invalid line data: {data}')
-        
-        x1, y1, x2, y2 = map(float, parts)
-        start = Point(x1, y1)
-        end = Point(x2, y2)
-        new_line = LineSegment(start, end)
-        stack.append(new_line)
\ No newline at end of file
+        # single pass: split, convert and unpack, the unpack checks the count
+        try:
+            x1, y1, x2, y2 = map(float, data.split())
+        except ValueError:
+            raise ValueError(f'Invalid line data: {data}') from None
+
+        stack.append(LineSegment(Point(x1, y1), Point(x2, y2)))
\ No newline at end of file
@@ -2,17 +2,21 @@ import math
 from .graphical_object import AbstractGraphicalObject
 from .point import Point
 from .rectangle import Rectangle
+from .utils import segment_intersects_ellipse, ellipse_polygon
 
 
 class Oval(AbstractGraphicalObject):
     NUM_SEGMENTS = 36  # Number of segments to approximate the ellipse
+    MIN_SEGMENTS = 8
+    SEGMENT_LENGTH = 4.0  # on-screen pixels per segment before NUM_SEGMENTS is reached
 
     def __init__(self, hot_point1=Point(0, 10), hot_point2=Point(10, 0)):
         super().__init__([hot_point1, hot_point2])
         self.hot_point1 = hot_point1
         self.hot_point2 = hot_point2
+        self.cached_polygon = None  # (num_segments, points) until the next change
 
-    def get_bounding_box(self):
+    def compute_bounding_box(self):
         p1 = self.get_hot_point(0)
         p2 = self.get_hot_point(1)
 
@@ -45,6 +49,11 @@ class Oval(AbstractGraphicalObject):
         else:  # outside the ellipse
             return math.sqrt(dx**2 + dy**2) - (radius_x * radius_y) / (math.sqrt((radius_y * dx) ** 2 + (radius_x * dy) ** 2))
         
+    def intersects_segment(self, start, end):
+        bbox = self.get_bounding_box()
+        center = Point(bbox.x + bbox.width / 2, bbox.y + bbox.height / 2)
+        return segment_intersects_ellipse(start, end, center, bbox.width / 2, bbox.height / 2)
+
     def get_shape_name(self):
         return 'Oval'
     
@@ -62,20 +71,34 @@ class Oval(AbstractGraphicalObject):
         bbox = self.get_bounding_box()
 
         # Calculate the center and radii
-        center_x = bbox.x + bbox.width / 2
-        center_y = bbox.y + bbox.height / 2
+        center = Point(bbox.x + bbox.width / 2, bbox.y + bbox.height / 2)
         radius_x = bbox.width / 2
         radius_y = bbox.height / 2
 
-        polygon_points = []
-        
-        for i in range(self.NUM_SEGMENTS):
-            angle = 2 * math.pi * i / self.NUM_SEGMENTS
-            x = center_x + radius_x * math.cos(angle)
-            y = center_y + radius_y * math.sin(angle)
-            polygon_points.append(Point(x, y))
+        # renderers without a native ellipse get the cached tessellation,
+        # with fewer segments when the oval is small on screen
+        num_segments = self.get_num_segments(renderer.get_scale())
+        if renderer.NATIVE_ELLIPSE:
+            renderer.fill_ellipse(center, radius_x, radius_y, num_segments)
+        else:
+            renderer.fill_polygon(self.get_polygon(num_segments))
 
-        renderer.fill_polygon(polygon_points)
+    def get_polygon(self, num_segments):
+        if self.cached_polygon is None or self.cached_polygon[0] != num_segments:
+            bbox = self.get_bounding_box()
+            center = Point(bbox.x + bbox.width / 2, bbox.y + bbox.height / 2)
+            self.cached_polygon = (num_segments, ellipse_polygon(center, bbox.width / 2, bbox.height / 2, num_segments))
+        return self.cached_polygon[1]
+
+    def notify_changed(self):
+        self.cached_polygon = None
+        super().notify_changed()
+
+    def get_num_segments(self, scale=1.0):
+        bbox = self.get_bounding_box()
+        perimeter = math.pi * (bbox.width + bbox.height) / 2 * scale  # rough, fine for LOD
+        segments = math.ceil(perimeter / self.SEGMENT_LENGTH)
+        return max(self.MIN_SEGMENTS, min(self.NUM_SEGMENTS, segments))
 
     def get_shape_id(self):
         return '@OVAL'
@@ -86,12 +109,10 @@ class Oval(AbstractGraphicalObject):
         rows.append(f'{self.get_shape_id()} {p1.x} {p1.y} {p2.x} {p2.y}')
 
     def load(self, stack, data):
-        parts = data.split()
-        if len(parts) != 4:
-            raise ValueError(f'Invalid oval data: {data}')
-        
-        x1, y1, x2, y2 = map(float, parts)
-        hot_point1 = Point(x1, y1)
-        hot_point2 = Point(x2, y2)
-        new_oval = Oval(hot_point1, hot_point2)
-        stack.append(new_oval)
\ No newline at end of file
+        # single pass: split, convert and unpack, the unpack checks the count
+        try:
+            x1, y1, x2, y2 = map(float, data.split())
+        except ValueError:
+            raise ValueError(f'Invalid oval data: {data}') from None
+
+        stack.append(Oval(Point(x1, y1), Point(x2, y2)))
\ No newline at end of file
@@ -2,6 +2,12 @@ import math
 
 
 class Point:
+    # Points are never mutated: every operation returns a new Point, so
+    # instances can be shared and hashed. __slots__ drops the per-instance
+    # dict; read-only attributes are not enforced, as a __setattr__ guard
+    # would double the construction cost on hot paths.
+    __slots__ = ('x', 'y')
+
     def __init__(self, x, y):
         self.x = x
         self.y = y
@@ -15,6 +21,14 @@ class Point:
         # return new Point(self.x + dp.x, self.y + dp.y)
         new_p = Point(self.x + dp.x, self.y + dp.y)
         return new_p
+
+    def __eq__(self, other):
+        if not isinstance(other, Point):
+            return NotImplemented
+        return self.x == other.x and self.y == other.y
+
+    def __hash__(self):
+        return hash((self.x, self.y))
     
     def __repr__(self):
         return f'Point({self.x}, {self.y})'
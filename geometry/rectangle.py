@@ -1,6 +1,21 @@
 class Rectangle:
+    # immutable value type, see Point
+    __slots__ = ('x', 'y', 'width', 'height')
+
     def __init__(self, x, y, width, height):
         self.x = x
         self.y = y
         self.width = width
-        self.height = height
\ No newline at end of file
+        self.height = height
+
+    def __eq__(self, other):
+        if not isinstance(other, Rectangle):
+            return NotImplemented
+        return (self.x == other.x and self.y == other.y and
+                self.width == other.width and self.height == other.height)
+
+    def __hash__(self):
+        return hash((self.x, self.y, self.width, self.height))
+
+    def __repr__(self):
+        return f'Rectangle({self.x}, {self.y}, {self.width}, {self.height})'
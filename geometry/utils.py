@@ -1,5 +1,6 @@
 import math
 from .point import Point
+from .rectangle import Rectangle
 
 
 def distance_from_point(p1, p2):
@@ -25,4 +26,89 @@ def distance_from_line_segment(start, end, p):
         closest_y = start.y + t * segment_dy
         closest_point = Point(closest_x, closest_y)
 
-    return distance_from_point(closest_point, p)
\ No newline at end of file
+    return distance_from_point(closest_point, p)
+
+
+def segment_bounding_box(start, end):
+    return Rectangle(min(start.x, end.x), min(start.y, end.y), abs(end.x - start.x), abs(end.y - start.y))
+
+
+def _orientation(a, b, c):
+    # > 0 counter-clockwise, < 0 clockwise, 0 collinear
+    return (b.x - a.x) * (c.y - a.y) - (b.y - a.y) * (c.x - a.x)
+
+
+def _on_segment(a, b, p):
+    # p is collinear with a-b, check it lies within its extent
+    return (min(a.x, b.x) <= p.x <= max(a.x, b.x) and
+            min(a.y, b.y) <= p.y <= max(a.y, b.y))
+
+
+def segments_intersect(a1, a2, b1, b2):
+    # touching end points and collinear overlaps count
+    d1 = _orientation(b1, b2, a1)
+    d2 = _orientation(b1, b2, a2)
+    d3 = _orientation(a1, a2, b1)
+    d4 = _orientation(a1, a2, b2)
+
+    if ((d1 > 0 and d2 < 0) or (d1 < 0 and d2 > 0)) and ((d3 > 0 and d4 < 0) or (d3 < 0 and d4 > 0)):
+        return True
+
+    return ((d1 == 0 and _on_segment(b1, b2, a1)) or
+            (d2 == 0 and _on_segment(b1, b2, a2)) or
+            (d3 == 0 and _on_segment(a1, a2, b1)) or
+            (d4 == 0 and _on_segment(a1, a2, b2)))
+
+
+def segment_intersects_ellipse(start, end, center, radius_x, radius_y):
+    # the ellipse is filled, so a segment inside it intersects too
+    if radius_x == 0 or radius_y == 0:
+        # a flat ellipse is a segment
+        return segments_intersect(start, end, Point(center.x - radius_x, center.y - radius_y),
+                                  Point(center.x + radius_x, center.y + radius_y))
+
+    # scale the ellipse to the unit circle
+    unit_start = Point((start.x - center.x) / radius_x, (start.y - center.y) / radius_y)
+    unit_end = Point((end.x - center.x) / radius_x, (end.y - center.y) / radius_y)
+    return distance_from_line_segment(unit_start, unit_end, Point(0, 0)) <= 1
+
+
+def rectangles_intersect(r1, r2):
+    # touching edges count as an intersection
+    return not (r1.x + r1.width < r2.x or
+                r1.x > r2.x + r2.width or
+                r1.y + r1.height < r2.y or
+                r1.y > r2.y + r2.height)
+
+
+def union_of_rectangles(rects):
+    # smallest rectangle containing all of rects, None if there are none
+    min_x = min_y = float('inf')
+    max_x = max_y = float('-inf')
+    for r in rects:
+        min_x = min(min_x, r.x)
+        min_y = min(min_y, r.y)
+        max_x = max(max_x, r.x + r.width)
+        max_y = max(max_y, r.y + r.height)
+
+    if min_x == float('inf'):
+        return None
+    return Rectangle(min_x, min_y, max_x - min_x, max_y - min_y)
+
+
+UNIT_CIRCLES = {}  # num_segments -> ((cos, sin), ...), shared by all ellipses
+
+
+def unit_circle(num_segments):
+    table = UNIT_CIRCLES.get(num_segments)
+    if table is None:
+        table = UNIT_CIRCLES[num_segments] = tuple(
+            (math.cos(2 * math.pi * i / num_segments), math.sin(2 * math.pi * i / num_segments))
+            for i in range(num_segments))
+    return table
+
+
+def ellipse_polygon(center, radius_x, radius_y, num_segments):
+    # tessellates an axis-aligned ellipse, starting at angle 0
+    cx, cy = center.x, center.y
+    return [Point(cx + radius_x * c, cy + radius_y * s) for c, s in unit_circle(num_segments)]
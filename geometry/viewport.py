@@ -0,0 +1,37 @@
+from .point import Point
+from .rectangle import Rectangle
+
+
+class Viewport:
+    # Maps drawing coordinates to screen pixels:
+    #   screen = (world - origin) * zoom
+    # origin is the drawing point shown at the top-left corner.
+    MIN_ZOOM = 0.01
+    MAX_ZOOM = 100.0
+
+    def __init__(self, origin=Point(0, 0), zoom=1.0):
+        self.origin = origin
+        self.zoom = zoom
+
+    def to_screen(self, p):
+        return Point((p.x - self.origin.x) * self.zoom, (p.y - self.origin.y) * self.zoom)
+
+    def to_world(self, x, y):
+        return Point(x / self.zoom + self.origin.x, y / self.zoom + self.origin.y)
+
+    def visible_rect(self, width, height):
+        return Rectangle(self.origin.x, self.origin.y, width / self.zoom, height / self.zoom)
+
+    def pan(self, dx, dy):
+        # dx, dy in pixels, the drawing follows the mouse
+        self.origin = Point(self.origin.x - dx / self.zoom, self.origin.y - dy / self.zoom)
+
+    def zoom_at(self, x, y, factor):
+        # keeps the drawing point under (x, y) in place, returns the
+        # factor actually applied after clamping
+        zoom = min(max(self.zoom * factor, self.MIN_ZOOM), self.MAX_ZOOM)
+        factor = zoom / self.zoom
+        anchor = self.to_world(x, y)
+        self.zoom = zoom
+        self.origin = Point(anchor.x - x / zoom, anchor.y - y / zoom)
+        return factor
@@ -3,4 +3,28 @@ from abc import ABC, abstractmethod
 class DocumentModelListener(ABC):
     @abstractmethod
     def document_change(self):
-        pass
\ No newline at end of file
+        pass
+
+    # -- Granular events --
+    # Each one falls back to document_change(), so a listener only
+    # overrides the events it can handle incrementally.
+    def object_added(self, obj, index):
+        self.document_change()
+
+    def object_removed(self, obj, index):
+        self.document_change()
+
+    def object_changed(self, obj):
+        self.document_change()
+
+    def selection_changed(self, obj):
+        self.document_change()
+
+    def z_order_changed(self, obj, old_index, new_index):
+        self.document_change()
+
+    # -- View only --
+    # Transient feedback (e.g. the eraser path) changed, the document did
+    # not. Nothing to do unless the listener draws that feedback.
+    def view_invalidated(self):
+        pass
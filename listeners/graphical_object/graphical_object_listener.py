@@ -8,4 +8,8 @@ class GraphicalObjectListener(ABC):
 
     @abstractmethod
     def graphical_object_selection_changed(self, go):
+        pass
+
+    def graphical_object_changing(self, go):
+        # sent before the geometry of go is modified
         pass
\ No newline at end of file
@@ -5,16 +5,22 @@ script_dir = os.path.dirname(os.path.abspath(__file__))
 if script_dir not in sys.path:
     sys.path.insert(0, script_dir)
 
+import bisect
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from renderer.tkinter_renderer import TkinterRenderer
-from renderer.svg_renderer import SVGRenderer
+from renderer.display_list import DisplayListCache
 from listeners.document_model.document_model_listener import DocumentModelListener
 from document.document_model import DocumentModel
+from document.drawing_io import create_prototype_map, read_drawing
+from document.autosave import AutosaveJournal, claim_orphaned_session, new_session_directory
+from document.export_task import ExportTask
 from geometry.line import LineSegment
 from geometry.oval import Oval
 from geometry.point import Point
-from geometry.composite_shape import CompositeShape
+from geometry.utils import rectangles_intersect
+from geometry.viewport import Viewport
 from state.idle_state import IdleState
 from state.add_shape_state import AddShapeState
 from state.select_shape_state import SelectShapeState
@@ -22,11 +28,38 @@ from state.eraser_state import EraserState
 
 
 class DrawingCanvas(tk.Canvas, DocumentModelListener):
-    def __init__(self, parent_gui, document_model):
+    DECORATION_TAG = 'decoration'
+    TARGET_FPS = 60
+    ZOOM_STEP = 1.2
+    MIN_VISIBLE_SIZE = 0.5  # pixels, smaller objects are not drawn
+
+    def __init__(self, parent_gui, document_model, target_fps=TARGET_FPS):
         super().__init__(parent_gui, bg='white', highlightthickness=0)
 
         self.gui = parent_gui
         self.document_model = document_model
+        # retained canvas items: every rendered object owns one unique tag,
+        # only objects inside the visible region are rendered
+        self.object_tags = {}
+        self.rendered_objects = []  # mirror of the model's z-order
+        self.next_tag_id = 0
+        # recorded primitives, objects scrolling back into view or restacked
+        # after a reconcile are replayed instead of rendered again
+        self.display_lists = DisplayListCache()
+
+        self.viewport = Viewport()
+        self.visible_rect = self.viewport.visible_rect(1, 1)
+        self.view_dirty = True
+        self.pan_anchor = None
+
+        # model events only mark the view dirty, painting happens at most
+        # once per frame in flush_repaint()
+        self.set_target_fps(target_fps)
+        self.repaint_id = None
+        self.last_frame_time = 0.0
+        self.objects_dirty = True  # the first frame picks up what the model already holds
+        self.dirty_objects = {}
+        self.repaint_counters = {'events': 0, 'coalesced': 0, 'frames': 0}
         self.document_model.add_document_model_listener(self)
 
         self.focus_set()  # Set focus to the canvas to capture keyboard events
@@ -34,10 +67,17 @@ class DrawingCanvas(tk.Canvas, DocumentModelListener):
         self.bind('<ButtonPress-1>', self.mouse_down_handler)
         self.bind('<ButtonRelease-1>', self.mouse_up_handler)
         self.bind('<B1-Motion>', self.mouse_dragged_handler)
+        # middle button pans, the wheel zooms around the pointer
+        self.bind('<ButtonPress-2>', self.pan_start_handler)
+        self.bind('<B2-Motion>', self.pan_handler)
+        self.bind('<MouseWheel>', self.zoom_handler)
+        self.bind('<Button-4>', self.zoom_handler)
+        self.bind('<Button-5>', self.zoom_handler)
+        self.bind('<Configure>', lambda event: self.view_changed())
 
     def mouse_down_handler(self, event):
         state = self.gui.get_current_state()
-        p = Point(event.x, event.y)
+        p = self.viewport.to_world(event.x, event.y)
         # Determine if shift or ctrl keys are pressed
         shift = (event.state & 0x0001) != 0
         ctrl = (event.state & 0x0004) != 0
@@ -45,7 +85,7 @@ class DrawingCanvas(tk.Canvas, DocumentModelListener):
 
     def mouse_up_handler(self, event):
         state = self.gui.get_current_state()
-        p = Point(event.x, event.y)
+        p = self.viewport.to_world(event.x, event.y)
         # Determine if shift or ctrl keys are pressed
         shift = (event.state & 0x0001) != 0
         ctrl = (event.state & 0x0004) != 0
@@ -53,7 +93,7 @@ class DrawingCanvas(tk.Canvas, DocumentModelListener):
 
     def mouse_dragged_handler(self, event):
         state = self.gui.get_current_state()
-        p = Point(event.x, event.y)
+        p = self.viewport.to_world(event.x, event.y)
         state.mouse_dragged(p)
 
     def key_pressed_handler(self, event):
@@ -61,22 +101,246 @@ class DrawingCanvas(tk.Canvas, DocumentModelListener):
         key_code = event.keysym
         state.key_pressed(key_code)
         
-    def paint(self):
-        self.delete('all')
-        renderer = TkinterRenderer(self)
+    # -- Repaint scheduling --
+    def set_target_fps(self, fps):
+        self.frame_interval = 1.0 / fps
+
+    def schedule_repaint(self):
+        self.repaint_counters['events'] += 1
+        if self.repaint_id is not None:
+            self.repaint_counters['coalesced'] += 1
+            return
+
+        wait = self.last_frame_time + self.frame_interval - time.perf_counter()
+        if wait <= 0:
+            self.repaint_id = self.after_idle(self.flush_repaint)
+        else:
+            self.repaint_id = self.after(int(wait * 1000) + 1, self.flush_repaint)
+
+    def flush_repaint(self):
+        self.repaint_id = None
+        self.last_frame_time = time.perf_counter()
+        self.repaint_counters['frames'] += 1
+
+        dirty_objects = self.dirty_objects
+        self.dirty_objects = {}
+        if self.view_dirty:
+            self.update_visible_objects()
+        if self.objects_dirty:
+            self.objects_dirty = False
+            objects = self.document_model.list()
+            if objects != self.rendered_objects:
+                self.sync_objects(objects)
+
+        for obj in dirty_objects:
+            self.update_object(obj)
+
+        self.paint_decorations()
+
+    # -- Viewport --
+    def pan_start_handler(self, event):
+        self.pan_anchor = (event.x, event.y)
+
+    def pan_handler(self, event):
+        dx, dy = event.x - self.pan_anchor[0], event.y - self.pan_anchor[1]
+        self.pan_anchor = (event.x, event.y)
+        self.pan(dx, dy)
+
+    def zoom_handler(self, event):
+        zoom_in = event.num == 4 or getattr(event, 'delta', 0) > 0
+        self.zoom_at(event.x, event.y, self.ZOOM_STEP if zoom_in else 1 / self.ZOOM_STEP)
+
+    def pan(self, dx, dy):
+        # rendered items are moved, not redrawn; culling catches up on the next frame
+        self.viewport.pan(dx, dy)
+        self.move('all', dx, dy)
+        self.view_changed()
+
+    def zoom_at(self, x, y, factor):
+        factor = self.viewport.zoom_at(x, y, factor)
+        self.scale('all', x, y, factor, factor)
+        self.view_changed()
+
+    def view_changed(self):
+        self.view_dirty = True
+        self.schedule_repaint()
+
+    def update_visible_objects(self):
+        self.view_dirty = False
+        self.visible_rect = self.viewport.visible_rect(self.winfo_width(), self.winfo_height())
+
+        visible = self.visible_objects()
+        visible_set = set(visible)
+        for obj in [o for o in self.object_tags if o not in visible_set]:
+            self.delete(self.object_tags.pop(obj))
+        self.show_objects([o for o in visible if o not in self.object_tags])
+
+    def is_visible(self, obj):
+        # objects under MIN_VISIBLE_SIZE pixels are culled as well
+        bbox = obj.get_bounding_box()
+        return (rectangles_intersect(bbox, self.visible_rect) and
+                max(bbox.width, bbox.height) * self.viewport.zoom >= self.MIN_VISIBLE_SIZE)
+
+    def visible_objects(self):
+        # the spatial index keeps this proportional to the visible region
+        candidates = self.document_model.find_graphical_objects_in_rect(self.visible_rect)
+        return [obj for obj in candidates if self.is_visible(obj)]
+
+    # -- Retained canvas items --
+    def sync_objects(self, objects):
+        current = set(objects)
+        for obj in [o for o in self.object_tags if o not in current]:
+            self.delete(self.object_tags.pop(obj))
+        self.display_lists.retain(current)
+
+        remaining = [o for o in self.rendered_objects if o in self.object_tags]
+        self.rendered_objects = objects
+        new_objects = [o for o in self.visible_objects() if o not in self.object_tags]
+
+        # a reorder of the objects already shown needs a full restack
+        shown = [o for o in objects if o in self.object_tags]
+        if shown != remaining:
+            self.restack_objects(shown)
+        self.show_objects(new_objects)
+
+    def show_objects(self, objects):
+        # renders objects that just became visible, each one placed right
+        # below the closest rendered object above it in z-order
+        if not objects:
+            return
+        z_index = self.document_model.get_z_index
+        shown = sorted((z_index(o), self.object_tags[o]) for o in self.object_tags)
+        keys = [z for z, _ in shown]
+        tags = [tag for _, tag in shown]
+
+        for z, obj in sorted(((z_index(o), o) for o in objects), key=lambda item: item[0], reverse=True):
+            tag = self.render_object(obj)
+            i = bisect.bisect(keys, z)
+            if i < len(keys):
+                try:
+                    self.tag_lower(tag, tags[i])
+                except tk.TclError:  # the object above has no items
+                    self.restack_objects(self.rendered_objects)
+            keys.insert(i, z)
+            tags.insert(i, tag)
+
+    def update_object(self, obj):
+        # redraws, shows or hides obj after its geometry changed
+        visible = self.is_visible(obj)
+        if obj in self.object_tags:
+            if visible:
+                self.redraw_object(obj)
+            else:
+                self.delete(self.object_tags.pop(obj))
+        elif visible and self.document_model.contains(obj):
+            self.show_objects([obj])
+
+    def render_object(self, obj):
+        tag = self.new_object_tag()
+        self.display_lists.render(obj, TkinterRenderer(self, (tag,), self.viewport))
+        self.object_tags[obj] = tag
+        return tag
+
+    def redraw_object(self, obj):
+        old_tag = self.object_tags[obj]
+        tag = self.render_object(obj)
+
+        if self.find_withtag(old_tag):
+            # keep the new items exactly where the old ones were in the stack
+            self.tag_lower(tag, old_tag)
+            self.delete(old_tag)
+        else:
+            self.restack_objects(self.rendered_objects)
+
+    def place_object(self, index):
+        # move the object at index just below the closest rendered object above it
+        objects = self.rendered_objects
+        tag = self.object_tags[objects[index]]
+        for i in range(index + 1, len(objects)):
+            above_tag = self.object_tags.get(objects[i])
+            if above_tag is not None and self.find_withtag(above_tag):
+                self.tag_lower(tag, above_tag)
+                return
+
+        self.tag_raise(tag)
+        self.tag_raise(self.DECORATION_TAG)
+
+    def restack_objects(self, objects):
+        for obj in objects:
+            tag = self.object_tags.get(obj)
+            if tag is not None:
+                self.tag_raise(tag)
+        self.tag_raise(self.DECORATION_TAG)
+
+    def new_object_tag(self):
+        self.next_tag_id += 1
+        return f'object{self.next_tag_id}'
+
+    def paint_decorations(self):
+        self.delete(self.DECORATION_TAG)
+        renderer = TkinterRenderer(self, (self.DECORATION_TAG,), self.viewport)
         current_state = self.gui.get_current_state()
 
-        for obj in self.document_model.list():
-            obj.render(renderer)
+        # states only decorate selected objects, so others are skipped
+        for obj in self.document_model.get_selected_objects():
             current_state.after_draw(renderer, obj)
 
         current_state.after_draw(renderer)
 
+    # -- Document model events --
     def document_change(self):
-        self.paint()
+        # geometry always arrives through object_changed, so a
+        # coarse change only needs the object list reconciled
+        self.objects_dirty = True
+        self.schedule_repaint()
+
+    # structural events keep the mirror in step right away, unless a
+    # pending reconcile will rebuild it anyway
+    def object_added(self, obj, index):
+        if not self.objects_dirty:
+            self.rendered_objects.insert(index, obj)
+            if self.is_visible(obj):
+                self.render_object(obj)
+                self.place_object(index)
+        self.schedule_repaint()
+
+    def object_removed(self, obj, index):
+        if not self.objects_dirty:
+            del self.rendered_objects[index]
+            if obj in self.object_tags:
+                self.delete(self.object_tags.pop(obj))
+        self.display_lists.discard(obj)
+        self.dirty_objects.pop(obj, None)
+        self.schedule_repaint()
+
+    def object_changed(self, obj):
+        self.dirty_objects[obj] = True
+        self.schedule_repaint()
+
+    def selection_changed(self, obj):
+        self.schedule_repaint()
+
+    def view_invalidated(self):
+        # decorations only, the rendered objects stay as they are
+        self.schedule_repaint()
+
+    def z_order_changed(self, obj, old_index, new_index):
+        if self.objects_dirty:
+            return
+        objects = self.rendered_objects
+        if abs(new_index - old_index) == 1:
+            objects[old_index], objects[new_index] = objects[new_index], objects[old_index]
+        else:
+            objects.insert(new_index, objects.pop(old_index))
+        if obj in self.object_tags:
+            self.place_object(new_index)
 
 
 class Paint(tk.Tk):
+    AUTOSAVE_DIRECTORY = os.path.join(os.path.expanduser('~'), '.goatpaint', 'autosave')  # a session per window
+    PROGRESS_INTERVAL = 100  # ms between progress updates of a save or export
+    CLOSE_TIMEOUT = 0.5  # s a cancelled save or export gets to clean up on exit
+
     def __init__(self, prototypes):
         super().__init__()
         self.title('GoatPaint')
@@ -114,19 +378,63 @@ class Paint(tk.Tk):
         load_button = tk.Button(toolbar, text='Load', command=self.load_drawing)
         load_button.pack(side=tk.LEFT, padx=2, pady=2)
 
-        self.prototype_map = {proto.get_shape_id(): proto for proto in self.prototypes}
-        self.prototype_map['@COMP'] = CompositeShape([])
+        # saves and exports run in the background, one at a time
+        self.task = None
+        self.task_description = ''
+        self.cancel_button = tk.Button(toolbar, text='Cancel', command=self.cancel_task)
+        self.task_label = tk.Label(toolbar)
+        self.task_label.pack(side=tk.RIGHT, padx=2, pady=2)
+
+        self.prototype_map = create_prototype_map(self.prototypes)
 
         self.canvas = DrawingCanvas(self, self.document_model)
         self.canvas.pack(fill=tk.BOTH, expand=True)
 
         self.bind('<Key>', self.key_pressed_handler)
+        # Caps Lock turns Ctrl+Z into <Control-Z> as well, so Shift is checked
+        self.bind('<Control-z>', self.undo_handler)
+        self.bind('<Control-Z>', self.undo_handler)
+        self.bind('<Control-y>', lambda event: self.document_model.redo())
+        self.bind('<Control-Y>', lambda event: self.document_model.redo())
 
         print('Welcome to Goat Paint!')
-        # --- HARD-CODED OBJECTS FOR TESTING ---
-        self.document_model.add_graphical_object(LineSegment(Point(50, 50), Point(200, 200)))
-        self.document_model.add_graphical_object(Oval(Point(100, 100), Point(300, 200)))
-        self.document_model.add_graphical_object(Oval(Point(400, 100), Point(600, 200)))
+        # a session nobody holds means that window didn't exit cleanly;
+        # sessions of windows still open are left alone
+        orphan = claim_orphaned_session(self.AUTOSAVE_DIRECTORY)
+        try:
+            recovered = orphan.recover(self.prototype_map) if orphan is not None else None
+        except (OSError, ValueError) as e:
+            print(f'Autosave not recoverable: {e}')
+            recovered = None
+        with self.document_model.history.suspended(), self.document_model.batch():
+            if recovered and messagebox.askyesno('Recover', 'Recover the drawing from the last session?'):
+                for obj in recovered:
+                    self.document_model.add_graphical_object(obj)
+            else:
+                # --- HARD-CODED OBJECTS FOR TESTING ---
+                self.document_model.add_graphical_object(LineSegment(Point(50, 50), Point(200, 200)))
+                self.document_model.add_graphical_object(Oval(Point(100, 100), Point(300, 200)))
+                self.document_model.add_graphical_object(Oval(Point(400, 100), Point(600, 200)))
+
+        self.autosave = AutosaveJournal(self.document_model, new_session_directory(self.AUTOSAVE_DIRECTORY))
+        if orphan is not None:
+            # recovered or declined, the new session takes over either way
+            orphan.discard()
+        self.protocol('WM_DELETE_WINDOW', self.close)
+
+    def close(self):
+        if self.task is not None:
+            self.task.abandon(self.CLOSE_TIMEOUT)
+        # a clean exit leaves nothing to recover
+        self.autosave.close(discard=True)
+        self.destroy()
+
+    def undo_handler(self, event):
+        shift = (event.state & 0x0001) != 0
+        if shift:
+            self.document_model.redo()
+        else:
+            self.document_model.undo()
 
     def get_current_state(self):
         return self.current_state
@@ -146,70 +454,85 @@ class Paint(tk.Tk):
         else:
             self.current_state.key_pressed(key_code)
         
+    # -- Background saves and exports --
+    def task_running(self):
+        if self.task is not None:
+            messagebox.showwarning('Busy', f'{self.task_description} is still running.')
+        return self.task is not None
+
+    def start_task(self, task, description):
+        self.task = task
+        self.task_description = description
+        self.cancel_button.pack(side=tk.RIGHT, padx=2, pady=2)
+        task.start()
+        self.poll_task()
+
+    def poll_task(self):
+        # the worker thread never touches Tk, progress is picked up here
+        task = self.task
+        if not task.finished:
+            self.task_label.config(text=f'{self.task_description}: {task.progress():.0%}')
+            self.after(self.PROGRESS_INTERVAL, self.poll_task)
+            return
+
+        self.task = None
+        self.cancel_button.pack_forget()
+        self.task_label.config(text='')
+        if task.error is not None:
+            messagebox.showerror('Error', f'{self.task_description} failed: {task.error}')
+        elif not task.cancelled and task.kind == 'drawing':
+            messagebox.showinfo('Success', 'Drawing saved successfully!')
+
+    def cancel_task(self):
+        if self.task is not None:
+            self.task.cancel()
+
     def export_to_svg(self):
+        if self.task_running():
+            return
         filename = filedialog.asksaveasfilename(
             defaultextension='.svg',
-            filetypes=[('SVG (Scalable Vector Graphics) files', '*.svg'), ('All files', '*.*')],
+            filetypes=[('SVG (Scalable Vector Graphics) files', '*.svg'),
+                       ('Compressed SVG files', '*.svgz'), ('PNG images', '*.png'), ('All files', '*.*')],
             title='Save SVG File'
         )
 
         if filename:
-            renderer = SVGRenderer(filename)
-            for obj in self.document_model.list():
-                obj.render(renderer)
-
-            renderer.close()
+            kind = 'png' if filename.endswith('.png') else 'svg'
+            self.start_task(ExportTask(self.document_model.list(), filename, kind), 'Export')
 
     def save_drawing(self):
+        if self.task_running():
+            return
         filename = filedialog.asksaveasfilename(
             defaultextension='.txt',
-            filetypes=[('Text files', '*.txt'), ('All files', '*.*')],
+            filetypes=[('Text files', '*.txt'), ('GoatPaint binary files', '*.gbin'), ('All files', '*.*')],
             title='Save Drawing'
         )
 
         if filename:
-            try:
-                with open(filename, 'w') as file:
-                    rows = []
-                    for obj in self.document_model.list():
-                        obj.save(rows)
-                    file.write('\n'.join(rows))
-                messagebox.showinfo('Success', 'Drawing saved successfully!')
-            except Exception as e:
-                messagebox.showerror('Error', f'Failed to save drawing: {e}')
+            self.start_task(ExportTask(self.document_model.list(), filename, 'drawing'), 'Save')
 
     def load_drawing(self):
         filename = filedialog.askopenfilename(
-            filetypes=[('Text files', '*.txt'), ('All files', '*.*')],
+            filetypes=[('Text files', '*.txt'), ('GoatPaint binary files', '*.gbin'), ('All files', '*.*')],
             title='Load Drawing'
         )
+        if not filename:
+            return
+
         try:
-            with open(filename, "r") as f:
-                lines = f.readlines()
-        except IOError as e:
+            objects = read_drawing(filename, self.prototype_map)
+        except (IOError, ValueError) as e:  # includes DrawingFormatError
             messagebox.showerror('Error', f'Failed to load drawing: {e}')
             return
-        
-        self.document_model.clear()
-        stack = []
-
-        for line in lines:
-            line = line.strip()
-            if not line: continue
 
-            parts = line.split(' ', 1)
-            shape_id = parts[0]
-            data = parts[1] if len(parts) > 1 else ''
-
-            prototype = self.prototype_map.get(shape_id)
-            if prototype:
-                prototype.load(stack, data)
-            else:
-                messagebox.showerror('Error', f'Unknown shape ID: {shape_id}')
-                return
-            
-        for obj in stack:
-            self.document_model.add_graphical_object(obj)
+        # the current drawing is only replaced once the file parsed cleanly,
+        # a freshly loaded drawing has nothing to undo
+        with self.document_model.history.suspended(), self.document_model.batch():
+            self.document_model.clear()
+            for obj in objects:
+                self.document_model.add_graphical_object(obj)
 
 if __name__ == '__main__':
     paint = Paint([LineSegment(), Oval()])
@@ -0,0 +1,118 @@
+# display_list.py
+# Recorded rendering. A RecordingRenderer captures the primitives an
+# object emits into a DisplayList: flat arrays of coordinates per kind of
+# primitive plus the order of the calls. Replaying one into any backend
+# skips the object graph, composite traversal and oval tessellation.
+# DisplayListCache keeps one list per object until the object changes.
+from array import array
+from .renderer import Renderer
+from geometry.point import Point
+from listeners.graphical_object.graphical_object_listener import GraphicalObjectListener
+
+LINE, POLYGON, ELLIPSE, POLYLINE = range(4)
+
+
+class DisplayList:
+    def __init__(self, scale=1.0, native_ellipse=False):
+        # recorded for backends with this scale and ellipse support
+        self.scale = scale
+        self.native_ellipse = native_ellipse
+        self.ops = array('B')  # primitive kinds in call order
+        self.lines = array('d')  # x1 y1 x2 y2 per line
+        self.ellipses = array('d')  # cx cy rx ry segments per ellipse
+        self.points = array('d')  # x y pairs of every polygon and polyline
+        self.sizes = array('I')  # point count per polygon or polyline
+
+    def matches(self, renderer):
+        return self.scale == renderer.get_scale() and self.native_ellipse == renderer.NATIVE_ELLIPSE
+
+    def replay(self, renderer):
+        lines, ellipses, points, sizes = self.lines, self.ellipses, self.points, self.sizes
+        line = ellipse = point = shape = 0
+        for op in self.ops:
+            if op == LINE:
+                renderer.draw_line_coords(lines[line], lines[line + 1], lines[line + 2], lines[line + 3])
+                line += 4
+            elif op == ELLIPSE:
+                renderer.fill_ellipse(Point(ellipses[ellipse], ellipses[ellipse + 1]), ellipses[ellipse + 2],
+                                      ellipses[ellipse + 3], int(ellipses[ellipse + 4]))
+                ellipse += 5
+            else:
+                end = point + 2 * sizes[shape]
+                if op == POLYGON:
+                    renderer.fill_polygon_coords(points[point:end])
+                else:
+                    renderer.draw_polyline_coords(points[point:end])
+                point = end
+                shape += 1
+
+
+class RecordingRenderer(Renderer):
+    def __init__(self, scale=1.0, native_ellipse=False):
+        # ovals pick their level of detail and tessellation from these
+        self.NATIVE_ELLIPSE = native_ellipse
+        self.scale = scale
+        self.display_list = DisplayList(scale, native_ellipse)
+
+    def get_scale(self):
+        return self.scale
+
+    def draw_line(self, start, end):
+        self.display_list.ops.append(LINE)
+        self.display_list.lines.extend((start.x, start.y, end.x, end.y))
+
+    def fill_polygon(self, points):
+        self._record_points(POLYGON, points)
+
+    def fill_ellipse(self, center, radius_x, radius_y, num_segments=36):
+        self.display_list.ops.append(ELLIPSE)
+        self.display_list.ellipses.extend((center.x, center.y, radius_x, radius_y, num_segments))
+
+    def draw_polyline(self, points):
+        self._record_points(POLYLINE, points)
+
+    def _record_points(self, op, points):
+        display_list = self.display_list
+        display_list.ops.append(op)
+        display_list.sizes.append(len(points))
+        display_list.points.extend([c for p in points for c in (p.x, p.y)])
+
+
+class DisplayListCache(GraphicalObjectListener):
+    # The cache listens to every object it holds a list for. A change only
+    # drops the list; discard() also detaches the cache, which must not
+    # happen from inside the object's own notification loop.
+    def __init__(self):
+        self.display_lists = {}
+
+    def get(self, obj, renderer):
+        # the list for obj as the given renderer would draw it
+        display_list = self.display_lists.get(obj)
+        if display_list is None or not display_list.matches(renderer):
+            recorder = RecordingRenderer(renderer.get_scale(), renderer.NATIVE_ELLIPSE)
+            obj.render(recorder)
+            display_list = self.display_lists[obj] = recorder.display_list
+            obj.add_graphical_object_listener(self)
+        return display_list
+
+    def render(self, obj, renderer):
+        self.get(obj, renderer).replay(renderer)
+
+    def discard(self, obj):
+        self.display_lists.pop(obj, None)
+        obj.remove_graphical_object_listener(self)
+
+    def retain(self, objects):
+        # discards the lists of everything not in objects (a set)
+        for obj in [o for o in self.display_lists if o not in objects]:
+            self.discard(obj)
+
+    def clear(self):
+        for obj in list(self.display_lists):
+            self.discard(obj)
+
+    def graphical_object_changed(self, go):
+        self.display_lists.pop(go, None)
+
+    def graphical_object_selection_changed(self, go):
+        pass
@@ -0,0 +1,357 @@
+# raster_renderer.py
+# Software rasterizer for thumbnails and previews, no display needed.
+# Pixels live in an RGB bytearray, polygons are filled scanline by
+# scanline (even-odd rule, sampled at pixel centers) and lines are drawn
+# as filled quads LINE_WIDTH pixels wide. Anti-aliasing supersamples
+# every pixel SUPERSAMPLE x SUPERSAMPLE times and averages the result.
+import math
+import struct
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from .renderer import Renderer
+from geometry.point import Point
+from geometry.rectangle import Rectangle
+from geometry.viewport import Viewport
+from geometry.utils import rectangles_intersect, union_of_rectangles
+from document.drawing_io import read_objects
+from document.spatial_index import SpatialIndex
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+WHITE = (255, 255, 255)
+BLUE = (0, 0, 255)
+RED = (255, 0, 0)
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+TILE_HEIGHT = 256  # rows rendered per worker task
+
+
+class RasterRenderer(Renderer):
+    LINE_WIDTH = 2
+    OUTLINE_WIDTH = 2
+    SUPERSAMPLE = 3
+
+    def __init__(self, width, height, viewport=None, antialias=False, background=WHITE):
+        self.width = width
+        self.height = height
+        self.viewport = viewport or Viewport()
+        self.samples = self.SUPERSAMPLE if antialias else 1
+        # everything below works on the supersampled grid
+        self.grid_width = width * self.samples
+        self.grid_height = height * self.samples
+        self.pixels = bytearray(bytes(background) * (self.grid_width * self.grid_height))
+
+    def get_scale(self):
+        return self.viewport.zoom * self.samples
+
+    def _grid(self, p):
+        s = self.viewport.to_screen(p)
+        return (s.x * self.samples, s.y * self.samples)
+
+    # -- Renderer primitives --
+    def draw_line(self, start, end):
+        self._stroke(self._grid(start), self._grid(end), self.LINE_WIDTH, BLUE)
+
+    def fill_polygon(self, points):
+        grid_points = [self._grid(p) for p in points]
+        if len(grid_points) < 3:
+            return
+        self._fill([grid_points], BLUE)
+        self._outline(grid_points, self.OUTLINE_WIDTH, RED)
+
+    def draw_polyline(self, points):
+        grid_points = [self._grid(p) for p in points]
+        for i in range(len(grid_points) - 1):
+            self._stroke(grid_points[i], grid_points[i + 1], self.LINE_WIDTH, BLUE)
+
+    def _grid_coords(self, coords):
+        # same arithmetic as _grid(), so replays are pixel-identical
+        ox, oy, zoom, s = self.viewport.origin.x, self.viewport.origin.y, self.viewport.zoom, self.samples
+        return [((x - ox) * zoom * s, (y - oy) * zoom * s) for x, y in zip(coords[::2], coords[1::2])]
+
+    def draw_line_coords(self, x1, y1, x2, y2):
+        start, end = self._grid_coords((x1, y1, x2, y2))
+        self._stroke(start, end, self.LINE_WIDTH, BLUE)
+
+    def fill_polygon_coords(self, coords):
+        grid_points = self._grid_coords(coords)
+        if len(grid_points) < 3:
+            return
+        self._fill([grid_points], BLUE)
+        self._outline(grid_points, self.OUTLINE_WIDTH, RED)
+
+    # -- Scan conversion --
+    def _stroke(self, a, b, width, color):
+        # a segment is a quad, half the width to each side
+        half = width * self.samples / 2
+        dx, dy = b[0] - a[0], b[1] - a[1]
+        length = math.hypot(dx, dy)
+        if length == 0:
+            dx, dy, length = 1.0, 0.0, 1.0
+            a = (a[0] - half, a[1])
+            b = (b[0] + half, b[1])
+        nx, ny = -dy / length * half, dx / length * half
+        self._fill([[(a[0] + nx, a[1] + ny), (b[0] + nx, b[1] + ny),
+                     (b[0] - nx, b[1] - ny), (a[0] - nx, a[1] - ny)]], color)
+
+    def _outline(self, points, width, color):
+        # A closed outline is filled as one ring between the polygon offset
+        # outwards and inwards by half the width (mitered corners). Sharp
+        # or degenerate corners fall back to one quad per edge.
+        half = width * self.samples / 2
+        count = len(points)
+        normals = []
+        for i in range(count):
+            (x0, y0), (x1, y1) = points[i - 1], points[i]
+            length = math.hypot(x1 - x0, y1 - y0)
+            if length == 0:
+                normals = None
+                break
+            normals.append(((y0 - y1) / length, (x1 - x0) / length))  # normal of the edge ending at i
+
+        outer, inner = [], []
+        for i in range(count) if normals else ():
+            (ax, ay), (bx, by) = normals[i], normals[(i + 1) % count]
+            mx, my = ax + bx, ay + by
+            cos_half = (mx * ax + my * ay) / (math.hypot(mx, my) or 1)
+            if cos_half < 0.5:  # corner sharper than 60 degrees
+                break
+            scale = half / (math.hypot(mx, my) * cos_half)
+            x, y = points[i]
+            outer.append((x + mx * scale, y + my * scale))
+            inner.append((x - mx * scale, y - my * scale))
+
+        if normals and len(outer) == count:
+            self._fill([outer, inner], color)
+        else:
+            for i in range(count):
+                self._stroke(points[i - 1], points[i], width, color)
+
+    def _fill(self, contours, color):
+        # even-odd fill of one or more closed contours
+        ys = [y for points in contours for _, y in points]
+        first_row = max(0, math.ceil(min(ys) - 0.5))
+        last_row = min(self.grid_height - 1, math.floor(max(ys) - 0.5))
+        if first_row > last_row:
+            return
+
+        # every edge drops its crossings into the rows it spans, so the
+        # work follows the outline length, not rows times edges
+        crossings = [[] for _ in range(last_row - first_row + 1)]
+        for points in contours:
+            for i in range(len(points)):
+                (x0, y0), (x1, y1) = points[i - 1], points[i]
+                if y0 == y1:
+                    continue
+                if y0 > y1:
+                    x0, y0, x1, y1 = x1, y1, x0, y0
+                # rows whose centers satisfy y0 <= yc < y1
+                start = max(first_row, math.ceil(y0 - 0.5))
+                end = min(last_row + 1, math.ceil(y1 - 0.5))
+                slope = (x1 - x0) / (y1 - y0)
+                x = x0 + (start + 0.5 - y0) * slope
+                for row in range(start - first_row, end - first_row):
+                    crossings[row].append(x)
+                    x += slope
+
+        pixel = bytes(color)
+        stride = self.grid_width * 3
+        grid_width = self.grid_width
+        for row, xs in enumerate(crossings, first_row):
+            xs.sort()
+            offset = row * stride
+            for i in range(0, len(xs) - 1, 2):
+                # pixels whose centers fall inside [xs[i], xs[i + 1])
+                start = math.ceil(xs[i] - 0.5)
+                end = math.ceil(xs[i + 1] - 0.5)
+                if start < 0:
+                    start = 0
+                if end > grid_width:
+                    end = grid_width
+                if end > start:
+                    self.pixels[offset + start * 3:offset + end * 3] = pixel * (end - start)
+
+    # -- Output --
+    def get_pixels(self):
+        # RGB rows at the final resolution
+        if self.samples == 1:
+            return bytes(self.pixels)
+
+        s = self.samples
+        if HAS_NUMPY:
+            grid = np.frombuffer(self.pixels, dtype=np.uint8).reshape(self.height, s, self.width, s, 3)
+            return np.rint(grid.mean(axis=(1, 3))).astype(np.uint8).tobytes()
+
+        out = bytearray(self.width * self.height * 3)
+        stride = self.grid_width * 3
+        area = s * s
+        for y in range(self.height):
+            for x in range(self.width):
+                for c in range(3):
+                    total = 0
+                    for sy in range(s):
+                        offset = (y * s + sy) * stride + x * s * 3 + c
+                        total += sum(self.pixels[offset:offset + s * 3:3])
+                    out[(y * self.width + x) * 3 + c] = (total + area // 2) // area
+        return bytes(out)
+
+    def write_png(self, file_path):
+        write_png(file_path, self.width, self.height, self.get_pixels())
+
+
+class PngWriter:
+    # 8-bit RGB, no filtering. Rows are compressed as they are written and
+    # IDAT chunks go out as compressed data piles up, so only the current
+    # rows and zlib's window are ever held in memory.
+    IDAT_SIZE = 1 << 16
+
+    def __init__(self, file_path, width, height):
+        self.stride = width * 3
+        self.compressor = zlib.compressobj(6)
+        self.pending = bytearray()
+        self.file = open(file_path, 'wb')
+        self.file.write(PNG_SIGNATURE)
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 2, 0, 0, 0))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.finish()
+        self.file.close()
+
+    def write_rows(self, pixels):
+        stride = self.stride
+        raw = b''.join(b'\x00' + pixels[y:y + stride] for y in range(0, len(pixels), stride))
+        self._idat(self.compressor.compress(raw))
+
+    def finish(self):
+        self._idat(self.compressor.flush())
+        if self.pending:
+            self._chunk(b'IDAT', bytes(self.pending))
+        self._chunk(b'IEND', b'')
+
+    def _idat(self, data):
+        self.pending += data
+        while len(self.pending) >= self.IDAT_SIZE:
+            self._chunk(b'IDAT', bytes(self.pending[:self.IDAT_SIZE]))
+            del self.pending[:self.IDAT_SIZE]
+
+    def _chunk(self, kind, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(kind)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(data, zlib.crc32(kind))))
+
+
+def write_png(file_path, width, height, pixels):
+    with PngWriter(file_path, width, height) as png:
+        png.write_rows(pixels)
+
+
+# -- Tiled rendering --
+def render_png(objects, file_path, width=None, height=None, viewport=None, antialias=False,
+               tile_height=TILE_HEIGHT, jobs=1, progress=None):
+    # Renders objects into a PNG in horizontal tiles. With jobs > 1 the
+    # tiles are spread over a process pool; workers get the drawing as
+    # save rows, since live objects carry listeners that don't pickle.
+    # Without a size or viewport the drawing's bounding box is used.
+    # progress(done, total) is called after every tile and may raise to abort.
+    if viewport is None or width is None or height is None:
+        viewport, width, height = fit_viewport(objects, width, height)
+
+    tiles = [(y, min(tile_height, height - y)) for y in range(0, height, tile_height)]
+    tasks = [(width, y, tile_rows, viewport.origin.x, viewport.origin.y, viewport.zoom, antialias)
+             for y, tile_rows in tiles]
+
+    # bands are compressed as they arrive, the image is never whole in memory
+    with PngWriter(file_path, width, height) as png:
+        done = 0
+
+        def write_band(band):
+            nonlocal done
+            png.write_rows(band)
+            done += 1
+            if progress is not None:
+                progress(done, len(tasks))
+
+        if jobs == 1 or len(tiles) == 1:
+            scene = _build_scene(objects)
+            for task in tasks:
+                write_band(_render_tile(scene, *task))
+            return
+
+        rows = []
+        for obj in objects:
+            obj.save(rows)
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(rows,)) as pool:
+            # only a few tiles run ahead of the one being written, so
+            # finished bands don't pile up either
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.submit(_render_worker_tile, task))
+                if len(pending) > 2 * jobs:
+                    write_band(pending.popleft().result())
+            while pending:
+                write_band(pending.popleft().result())
+
+
+def fit_viewport(objects, width=None, height=None, margin=RasterRenderer.LINE_WIDTH):
+    # viewport showing the whole drawing, scaled to width (or height) if given
+    bbox = union_of_rectangles(obj.get_bounding_box() for obj in objects)
+    if bbox is None:
+        return Viewport(), width or 1, height or 1
+
+    extent_x = bbox.width + 2 * margin
+    extent_y = bbox.height + 2 * margin
+    if width is not None:
+        zoom = width / extent_x
+    elif height is not None:
+        zoom = height / extent_y
+    else:
+        zoom = 1.0
+    width = width or max(1, math.ceil(extent_x * zoom))
+    height = height or max(1, math.ceil(extent_y * zoom))
+    return Viewport(Point(bbox.x - margin, bbox.y - margin), zoom), width, height
+
+
+def _build_scene(objects):
+    # spatial index for culling plus each object's z position
+    index = SpatialIndex()
+    for obj in objects:
+        index.insert(obj)
+    return index, {obj: i for i, obj in enumerate(objects)}
+
+
+def _render_tile(scene, width, y, rows, origin_x, origin_y, zoom, antialias):
+    index, z_positions = scene
+    # the tile's viewport starts y pixels further down
+    viewport = Viewport(Point(origin_x, origin_y + y / zoom), zoom)
+    renderer = RasterRenderer(width, rows, viewport, antialias)
+
+    # a stroke may reach a little past an object's bounding box
+    pad = RasterRenderer.LINE_WIDTH / zoom
+    tile = viewport.visible_rect(width, rows)
+    tile = Rectangle(tile.x - pad, tile.y - pad, tile.width + 2 * pad, tile.height + 2 * pad)
+    visible = [obj for obj in index.query_rect(tile) if rectangles_intersect(obj.get_bounding_box(), tile)]
+    for obj in sorted(visible, key=z_positions.__getitem__):
+        obj.render(renderer)
+    return renderer.get_pixels()
+
+
+_worker_scene = None
+
+
+def _init_worker(rows):
+    global _worker_scene
+    _worker_scene = _build_scene(read_objects(rows))
+
+
+def _render_worker_tile(task):
+    return _render_tile(_worker_scene, *task)
@@ -1,11 +1,41 @@
 from abc import ABC, abstractmethod
+from geometry.point import Point
+from geometry.utils import ellipse_polygon
 
 
 class Renderer(ABC):
+    NATIVE_ELLIPSE = False  # True when fill_ellipse() does not tessellate
+
     @abstractmethod
-    def draw_line(start, end):
+    def draw_line(self, start, end):
         pass
 
     @abstractmethod
-    def fill_polygon(points):
-        pass
\ No newline at end of file
+    def fill_polygon(self, points):
+        pass
+
+    def get_scale(self):
+        # device pixels per drawing unit, used for level of detail
+        return 1.0
+
+    # -- Optional primitives --
+    # Renderers with native support override these, the defaults
+    # fall back to the two required primitives above.
+    def fill_ellipse(self, center, radius_x, radius_y, num_segments=36):
+        self.fill_polygon(ellipse_polygon(center, radius_x, radius_y, num_segments))
+
+    def draw_polyline(self, points):
+        for i in range(len(points) - 1):
+            self.draw_line(points[i], points[i + 1])
+
+    # -- Flat coordinate primitives --
+    # Display lists are replayed through these, coords is a flat
+    # x0, y0, x1, y1, ... sequence. Overriding them saves building Points.
+    def draw_line_coords(self, x1, y1, x2, y2):
+        self.draw_line(Point(x1, y1), Point(x2, y2))
+
+    def fill_polygon_coords(self, coords):
+        self.fill_polygon([Point(x, y) for x, y in zip(coords[::2], coords[1::2])])
+
+    def draw_polyline_coords(self, coords):
+        self.draw_polyline([Point(x, y) for x, y in zip(coords[::2], coords[1::2])])
@@ -1,23 +1,73 @@
+import gzip
 from .renderer import Renderer
 from geometry.point import Point
 
 
 class SVGRenderer(Renderer):
-    def __init__(self, file_path):
+    NATIVE_ELLIPSE = True
+    BUFFER_SIZE = 1 << 16
+    VIEW_BOX_MARGIN = 2  # keeps the widest stroke inside the view box
+
+    def __init__(self, file_path, stream=False, compress=None, view_box=None):
+        # stream=True writes each tag to a buffered file as soon as it is
+        # drawn instead of keeping the whole document in memory until close().
+        # compress defaults to gzip output for '.svgz' paths.
         self.file_path = file_path
+        self.compress = file_path.endswith('.svgz') if compress is None else compress
         self.svg_content = []
-        self.svg_content.append('<svg xmlns="http://www.w3.org/2000/svg" version="1.1">')
+        self.file = self._open() if stream else None
+        self.separator = ''
+
+        header = '<svg xmlns="http://www.w3.org/2000/svg" version="1.1"'
+        if view_box is not None:
+            m = self.VIEW_BOX_MARGIN
+            header += (f' viewBox="{view_box.x - m} {view_box.y - m} '
+                       f'{view_box.width + 2 * m} {view_box.height + 2 * m}"')
+        self.write(header + '>')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
 
     def close(self):
-        self.svg_content.append('</svg>')
-        with open(self.file_path, 'w') as f:
-            f.write('\n'.join(self.svg_content))
+        self.write('</svg>')
+        if self.file is None:
+            with self._open() as f:
+                f.write('\n'.join(self.svg_content))
+        else:
+            self.file.close()
+
+    def write(self, tag):
+        if self.file is None:
+            self.svg_content.append(tag)
+        else:
+            # same layout as the in-memory '\n'.join()
+            self.file.write(self.separator)
+            self.file.write(tag)
+            self.separator = '\n'
+
+    def _open(self):
+        if self.compress:
+            return gzip.open(self.file_path, 'wt', encoding='utf-8')
+        return open(self.file_path, 'w', buffering=self.BUFFER_SIZE, encoding='utf-8')
 
     def draw_line(self, start, end):
         tag = f'  <line x1="{start.x}" y1="{start.y}" x2="{end.x}" y2="{end.y}" style="stroke:blue;stroke-width:2" />'
-        self.svg_content.append(tag)
+        self.write(tag)
 
     def fill_polygon(self, points):
         points_str = ' '.join(f'{p.x},{p.y}' for p in points)
         tag = f'  <polygon points="{points_str}" style="fill:blue;stroke:red;stroke-width:1" />'
-        self.svg_content.append(tag)
\ No newline at end of file
+        self.write(tag)
+
+    def fill_ellipse(self, center, radius_x, radius_y, num_segments=36):
+        tag = (f'  <ellipse cx="{center.x}" cy="{center.y}" rx="{radius_x}" ry="{radius_y}" '
+               f'style="fill:blue;stroke:red;stroke-width:1" />')
+        self.write(tag)
+
+    def draw_polyline(self, points):
+        points_str = ' '.join(f'{p.x},{p.y}' for p in points)
+        tag = f'  <polyline points="{points_str}" style="fill:none;stroke:blue;stroke-width:2" />'
+        self.write(tag)
@@ -4,14 +4,61 @@ from geometry.point import Point
 
 
 class TkinterRenderer(Renderer):
-    def __init__(self, canvas: tk.Canvas):
+    NATIVE_ELLIPSE = True
+
+    def __init__(self, canvas: tk.Canvas, tags=(), viewport=None):
         self.canvas = canvas
+        self.tags = tags  # attached to every created item
+        self.viewport = viewport  # drawing to screen transform, None for identity
+
+    def get_scale(self):
+        return 1.0 if self.viewport is None else self.viewport.zoom
+
+    def _screen(self, p):
+        return p if self.viewport is None else self.viewport.to_screen(p)
+
+    def _screen_coords(self, coords):
+        if self.viewport is None:
+            return list(coords)
+        ox, oy, zoom = self.viewport.origin.x, self.viewport.origin.y, self.viewport.zoom
+        screen = [(c - ox) * zoom for c in coords]
+        screen[1::2] = [(c - oy) * zoom for c in coords[1::2]]
+        return screen
 
     def draw_line(self, start, end):
-        self.canvas.create_line(start.x, start.y, end.x, end.y, fill='blue', width=2)
+        start, end = self._screen(start), self._screen(end)
+        self.canvas.create_line(start.x, start.y, end.x, end.y, fill='blue', width=2, tags=self.tags)
 
     def fill_polygon(self, points):
-        tk_points = [(p.x, p.y) for p in points]
+        tk_points = [(p.x, p.y) for p in map(self._screen, points)]
 
         if tk_points:
-            self.canvas.create_polygon(tk_points, fill='blue', outline='red', width=2)
\ No newline at end of file
+            self.canvas.create_polygon(tk_points, fill='blue', outline='red', width=2, tags=self.tags)
+
+    def fill_ellipse(self, center, radius_x, radius_y, num_segments=36):
+        center = self._screen(center)
+        radius_x *= self.get_scale()
+        radius_y *= self.get_scale()
+        self.canvas.create_oval(center.x - radius_x, center.y - radius_y,
+                                center.x + radius_x, center.y + radius_y,
+                                fill='blue', outline='red', width=2, tags=self.tags)
+
+    def draw_polyline(self, points):
+        if len(points) > 1:
+            tk_points = [(p.x, p.y) for p in map(self._screen, points)]
+            self.canvas.create_line(tk_points, fill='blue', width=2, tags=self.tags)
+
+    def draw_line_coords(self, x1, y1, x2, y2):
+        if self.viewport is not None:
+            ox, oy, zoom = self.viewport.origin.x, self.viewport.origin.y, self.viewport.zoom
+            x1, y1, x2, y2 = (x1 - ox) * zoom, (y1 - oy) * zoom, (x2 - ox) * zoom, (y2 - oy) * zoom
+        self.canvas.create_line(x1, y1, x2, y2, fill='blue', width=2, tags=self.tags)
+
+    def fill_polygon_coords(self, coords):
+        if coords:
+            self.canvas.create_polygon(self._screen_coords(coords), fill='blue', outline='red', width=2,
+                                       tags=self.tags)
+
+    def draw_polyline_coords(self, coords):
+        if len(coords) > 2:
+            self.canvas.create_line(self._screen_coords(coords), fill='blue', width=2, tags=self.tags)
\ No newline at end of file
@@ -1,65 +1,62 @@
 from .state import State
 from geometry.point import Point
-from geometry.rectangle import Rectangle
 
 
 class EraserState(State):
     def __init__(self, model):
         self.model = model
         self.path_points = []  # points for the eraser path
+        self.erased_objects = {}  # objects the path touches so far, removed on mouse up
 
     def mouse_down(self, mouse_point, shift_down, ctrl_down):
         self.path_points.clear()
-        self.path_points.append(mouse_point)
-        self.model.notify_listeners()
+        self.erased_objects.clear()
+        self.extend_path(mouse_point)
+        self.model.notify_view_invalidated()
 
     def mouse_dragged(self, mouse_point):
-        self.path_points.append(mouse_point)
-        self.model.notify_listeners()
+        self.extend_path(mouse_point)
+        self.model.notify_view_invalidated()
 
     def mouse_up(self, mouse_point, shift_down, ctrl_down):
-        self.path_points.append(mouse_point)
-
-        objects_to_delete = []
-
-        for obj in self.model.list():
-            obj_bbox = obj.get_bounding_box()
-            
-            for i in range(len(self.path_points) - 1):
-                p1 = self.path_points[i]
-                p2 = self.path_points[i + 1]
-
-                segment_bbox = Rectangle(
-                    min(p1.x, p2.x), min(p1.y, p2.y),
-                    abs(p2.x - p1.x), abs(p2.y - p1.y)
-                )
-
-                if self._do_bboxes_intersect(obj_bbox, segment_bbox):
-                    objects_to_delete.append(obj)
-                    break
+        self.extend_path(mouse_point)
 
+        objects_to_delete = [obj for obj in self.erased_objects if self.model.contains(obj)]
         if objects_to_delete:
-            for obj in objects_to_delete:
-                self.model.remove_graphical_object(obj)
+            with self.model.batch():
+                for obj in objects_to_delete:
+                    self.model.remove_graphical_object(obj)
 
         self.path_points.clear()
-        self.model.notify_listeners()
+        self.erased_objects.clear()
+        self.model.notify_view_invalidated()
+
+    def extend_path(self, mouse_point):
+        # only the newest segment is tested, so the preview stays cheap
+        segment = self.path_points[-1:] + [mouse_point]
+        self.path_points.append(mouse_point)
+        for obj in self.model.find_graphical_objects_touching_path(segment):
+            self.erased_objects[obj] = True
 
     def after_draw(self, renderer, go=None):
-        if go is None and len(self.path_points) > 1:
-            for i in range(len(self.path_points) - 1):
-                p1 = self.path_points[i]
-                p2 = self.path_points[i + 1]
-                renderer.draw_line(p1, p2)
+        if go is not None:
+            return
+
+        # outline what will be erased on mouse up
+        for obj in self.erased_objects:
+            bbox = obj.get_bounding_box()
+            p1 = Point(bbox.x, bbox.y)
+            p2 = Point(bbox.x + bbox.width, bbox.y)
+            p3 = Point(bbox.x + bbox.width, bbox.y + bbox.height)
+            p4 = Point(bbox.x, bbox.y + bbox.height)
+            renderer.draw_polyline([p1, p2, p3, p4, p1])
+
+        if len(self.path_points) > 1:
+            renderer.draw_polyline(self.path_points)
 
-    def _do_bboxes_intersect(self, bbox1, bbox2):
-        return not (bbox1.x + bbox1.width < bbox2.x or
-                    bbox1.x > bbox2.x + bbox2.width or
-                    bbox1.y + bbox1.height < bbox2.y or
-                    bbox1.y > bbox2.y + bbox2.height)
-    
     def key_pressed(self, key_code):
         pass
 
     def on_leaving(self):
-        self.path_points.clear()
\ No newline at end of file
+        self.path_points.clear()
+        self.erased_objects.clear()
\ No newline at end of file
@@ -1,13 +1,18 @@
+from itertools import count
 from .state import State
 from geometry.point import Point
 from geometry.composite_shape import CompositeShape
 
+# one undo entry per drag, ids never repeat, not even across state instances
+_drag_gestures = count()
+
 
 class SelectShapeState(State):
     def __init__(self, model):
         self.model = model
         self.dragged_oject = None
         self.dragged_hot_point_idx = -1
+        self.drag_gesture = None
 
     def mouse_down(self, mouse_point, shift_down, ctrl_down):
         selected_objects = self.model.get_selected_objects()
@@ -17,6 +22,7 @@ class SelectShapeState(State):
             if hot_point_idx != -1:
                 self.dragged_oject = obj
                 self.dragged_hot_point_idx = hot_point_idx
+                self.drag_gesture = next(_drag_gestures)
                 return
             
         # if hot point is not selected, select the object
@@ -24,21 +30,24 @@ class SelectShapeState(State):
 
         if obj is None:
             if not ctrl_down:  # if nothing is pressed, and no object is selected -> deselect all
-                for o in list(self.model.get_selected_objects()):
-                    o.set_selected(False)
+                with self.model.batch():
+                    for o in list(self.model.get_selected_objects()):
+                        o.set_selected(False)
             return
         
         if ctrl_down:  # toggle selection
             obj.set_selected(not obj.is_selected())
         else:  # select only this object, deselect others
-            for o in list(self.model.get_selected_objects()):
-                o.set_selected(False)
-            obj.set_selected(True)
+            with self.model.batch():
+                for o in list(self.model.get_selected_objects()):
+                    o.set_selected(False)
+                obj.set_selected(True)
 
     def mouse_dragged(self, mouse_point):
         if self.dragged_oject is not None and self.dragged_hot_point_idx != -1:
             # move the dragged object
-            self.dragged_oject.set_hot_point(self.dragged_hot_point_idx, mouse_point)
+            with self.model.batch(coalesce_key=('drag', self.drag_gesture)):
+                self.dragged_oject.set_hot_point(self.dragged_hot_point_idx, mouse_point)
 
     def mouse_up(self, mouse_point, shift_down, ctrl_down):
         self.dragged_oject = None
@@ -49,25 +58,27 @@ class SelectShapeState(State):
 
         if key_code.lower() == 'g':
             if len(selected) > 1:
-                new_group = CompositeShape(selected)
-                
-                for obj in selected:
-                    self.model.remove_graphical_object(obj)
-                
-                self.model.add_graphical_object(new_group)
-                new_group.set_selected(True)
+                with self.model.batch():
+                    new_group = CompositeShape(selected)
+
+                    for obj in selected:
+                        self.model.remove_graphical_object(obj)
+
+                    self.model.add_graphical_object(new_group)
+                    new_group.set_selected(True)
             return
 
         if key_code.lower() == 'u':
             if len(selected) == 1 and isinstance(selected[0], CompositeShape):
                 group_to_ungroup = selected[0]
                 children = group_to_ungroup.get_children()
-                
-                self.model.remove_graphical_object(group_to_ungroup)
-                
-                for child in children:
-                    self.model.add_graphical_object(child)
-                    child.set_selected(True)
+
+                with self.model.batch():
+                    self.model.remove_graphical_object(group_to_ungroup)
+
+                    for child in children:
+                        self.model.add_graphical_object(child)
+                        child.set_selected(True)
             return
 
         if not selected:
@@ -81,16 +92,20 @@ class SelectShapeState(State):
         }
 
         if key_code in move_vectors:
-            for obj in selected:
-                obj.translate(move_vectors[key_code])
+            # repeated arrow keys on the same selection undo as one move
+            with self.model.batch(coalesce_key=('move', frozenset(selected))):
+                for obj in selected:
+                    obj.translate(move_vectors[key_code])
             return
         
         if key_code == 'plus':
-            for obj in selected:
-                self.model.increase_z(obj)
+            with self.model.batch():
+                for obj in selected:
+                    self.model.increase_z(obj)
         elif key_code == 'minus':
-            for obj in selected:
-                self.model.decrease_z(obj)
+            with self.model.batch():
+                for obj in selected:
+                    self.model.decrease_z(obj)
 
     def after_draw(self, renderer, obj=None):
         if obj is None: return
@@ -102,10 +117,7 @@ class SelectShapeState(State):
             p3 = Point(bbox.x + bbox.width, bbox.y + bbox.height)
             p4 = Point(bbox.x, bbox.y + bbox.height)
             # Draw the bounding box in blue
-            renderer.draw_line(p1, p2)
-            renderer.draw_line(p2, p3)
-            renderer.draw_line(p3, p4)
-            renderer.draw_line(p4, p1)
+            renderer.draw_polyline([p1, p2, p3, p4, p1])
 
             # if only one object is selected, draw the hot points
             if len(self.model.get_selected_objects()) == 1:
@@ -119,5 +131,6 @@ class SelectShapeState(State):
                     renderer.fill_polygon([p1_hp, p2_hp, p3_hp, p4_hp])
 
     def on_leaving(self):
-        for o in list(self.model.get_selected_objects()):
-            o.set_selected(False)
\ No newline at end of file
+        with self.model.batch():
+            for o in list(self.model.get_selected_objects()):
+                o.set_selected(False)
\ No newline at end of file
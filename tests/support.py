@@ -0,0 +1,44 @@
+# Helpers shared by the tests.
+import random
+from document.document_model import DocumentModel
+from geometry.composite_shape import CompositeShape
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.point import Point
+
+
+def describe(objects):
+    # the type and hot points of every leaf, per object and bottom to top;
+    # numbers compare equal whether they were loaded as ints or floats
+    result = []
+    for obj in objects:
+        leaves = obj.get_leaves() if isinstance(obj, CompositeShape) else [obj]
+        result.append([(type(leaf), [(p.x, p.y) for p in leaf.hot_points]) for leaf in leaves])
+    return result
+
+
+def random_shape(rng, size, extent):
+    x, y = rng.uniform(0, extent), rng.uniform(0, extent)
+    kind = rng.random()
+    if kind < 0.05:
+        # degenerate: a point-sized line or a flat oval
+        return LineSegment(Point(x, y), Point(x, y)) if kind < 0.025 else Oval(Point(x, y), Point(x + size, y))
+    end = Point(x + rng.uniform(-size, size), y + rng.uniform(-size, size))
+    if kind < 0.5:
+        return LineSegment(Point(x, y), end)
+    if kind < 0.9:
+        return Oval(Point(x, y), end)
+    return CompositeShape([random_shape(rng, size, extent) for _ in range(rng.randint(2, 4))])
+
+
+def random_model(seed, count, extent, size=30):
+    rng = random.Random(seed)
+    model = DocumentModel()
+    for _ in range(count):
+        model.add_graphical_object(random_shape(rng, size, extent))
+    # moved, resized and removed objects must be refreshed in the arrays
+    for obj in rng.sample(model.list(), count // 10):
+        obj.translate(Point(rng.uniform(-20, 20), rng.uniform(-20, 20)))
+    for obj in rng.sample(model.list(), count // 10):
+        model.remove_graphical_object(obj)
+    return model, rng
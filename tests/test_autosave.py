@@ -0,0 +1,130 @@
+import os
+import shutil
+import tempfile
+import unittest
+from document.autosave import (AutosaveJournal, SessionLocked, claim_orphaned_session, new_session_directory,
+                               recover_autosave, JOURNAL_NAME)
+from document.document_model import DocumentModel
+from geometry.composite_shape import CompositeShape
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.point import Point
+from support import describe
+
+
+class AutosaveTest(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.directory = new_session_directory(self.root)
+        self.journal_path = os.path.join(self.directory, JOURNAL_NAME)
+        self.model = DocumentModel()
+        self.model.add_graphical_object(LineSegment(Point(0, 0), Point(10, 10)))
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def edit(self):
+        # one journal record per step, returns the document after each
+        states = []
+        self.model.add_graphical_object(Oval(Point(5, 5), Point(15, 20)))
+        states.append(describe(self.model.list()))
+        self.model.list()[0].translate(Point(3, 4))
+        states.append(describe(self.model.list()))
+        self.model.increase_z(self.model.list()[0])
+        states.append(describe(self.model.list()))
+        self.model.add_graphical_object(CompositeShape([LineSegment(), Oval()]), 1)
+        states.append(describe(self.model.list()))
+        return states
+
+    def crash(self, autosave):
+        # stops the writer but leaves the files behind
+        autosave.close()
+
+    def test_recovers_every_record(self):
+        autosave = AutosaveJournal(self.model, self.directory)
+        states = self.edit()
+        self.crash(autosave)
+        self.assertEqual(describe(recover_autosave(self.directory)), states[-1])
+
+    def test_truncated_journal_stops_at_the_last_complete_record(self):
+        autosave = AutosaveJournal(self.model, self.directory)
+        states = self.edit()
+        self.crash(autosave)
+        with open(self.journal_path, 'r') as f:
+            records = f.read()
+        # the last record adds the group: a header and three rows. Any cut
+        # inside it, rows included, falls back to the state before it
+        last_record_start = records.rindex('\n', 0, records.rindex(' A ')) + 1
+        self.assertEqual(records[last_record_start:].count('\n'), 4)
+        for cut in range(last_record_start, len(records)):
+            with open(self.journal_path, 'w') as f:
+                f.write(records[:cut])
+            self.assertEqual(describe(recover_autosave(self.directory)), states[-2])
+
+    def test_garbage_after_the_journal_is_ignored(self):
+        autosave = AutosaveJournal(self.model, self.directory)
+        states = self.edit()
+        self.crash(autosave)
+        with open(self.journal_path, 'a') as f:
+            f.write('17 A 4')
+        self.assertEqual(describe(recover_autosave(self.directory)), states[-1])
+
+    def test_clean_close_leaves_nothing_to_recover(self):
+        autosave = AutosaveJournal(self.model, self.directory)
+        self.edit()
+        autosave.close(discard=True)
+        self.assertIsNone(recover_autosave(self.directory))
+
+    def test_coarse_changes_keep_the_snapshot_current(self):
+        autosave = AutosaveJournal(self.model, self.directory)
+        states = self.edit()
+        for _ in range(5):
+            self.model.notify_listeners()
+        with self.model.batch():
+            self.model.remove_graphical_object(self.model.list()[0])
+            self.model.notify_listeners()
+        self.crash(autosave)
+        self.assertEqual(describe(recover_autosave(self.directory)), states[-1][1:])
+
+    def test_a_session_is_held_by_one_journal(self):
+        autosave = AutosaveJournal(self.model, self.directory)
+        with self.assertRaises(SessionLocked):
+            AutosaveJournal(DocumentModel(), self.directory)
+        autosave.close(discard=True)
+
+    def test_only_sessions_nobody_holds_are_recovered(self):
+        live = AutosaveJournal(self.model, self.directory)
+        self.assertIsNone(claim_orphaned_session(self.root))
+
+        crashed_model = DocumentModel()
+        crashed_model.add_graphical_object(Oval(Point(1, 2), Point(3, 4)))
+        crashed = AutosaveJournal(crashed_model, new_session_directory(self.root))
+        self.crash(crashed)
+
+        orphan = claim_orphaned_session(self.root)
+        self.assertEqual(orphan.directory, crashed.directory)
+        # claimed, so a second instance starting now doesn't get it too
+        self.assertIsNone(claim_orphaned_session(self.root))
+        self.assertEqual(describe(orphan.recover()), describe(crashed_model.list()))
+        orphan.discard()
+        self.assertFalse(os.path.exists(crashed.directory))
+
+        # the live session is untouched and still ends up on disk
+        live.close()
+        self.assertEqual(describe(recover_autosave(self.directory)), describe(self.model.list()))
+
+    def test_closing_one_window_keeps_the_other_autosave(self):
+        first = AutosaveJournal(self.model, self.directory)
+        second = AutosaveJournal(DocumentModel(), new_session_directory(self.root))
+        second.close(discard=True)
+        self.crash(first)
+        self.assertEqual(describe(recover_autosave(self.directory)), describe(self.model.list()))
+
+    def test_empty_orphans_are_removed(self):
+        empty = new_session_directory(self.root)
+        self.assertIsNone(claim_orphaned_session(self.root))
+        self.assertFalse(os.path.exists(empty))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,128 @@
+import os
+import struct
+import sys
+import tempfile
+import unittest
+from document.binary_drawing import BinaryDrawing, write_binary_drawing, HEADER, MAGIC, _align
+from document.drawing_io import read_drawing, DrawingFormatError
+from geometry.composite_shape import CompositeShape
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.point import Point
+
+
+def flatten(objects):
+    # iterative pre-order description, deep groups would overflow recursion
+    result = []
+    stack = list(reversed(objects))
+    while stack:
+        node = stack.pop()
+        if isinstance(node, CompositeShape):
+            result.append(('group', len(node.children)))
+            stack.extend(reversed(node.children))
+        else:
+            result.append((type(node), [(p.x, p.y) for p in node.hot_points]))
+    return result
+
+
+class BinaryDrawingTest(unittest.TestCase):
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.gbin')
+        os.close(handle)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def round_trip(self, objects, precision='d'):
+        write_binary_drawing(self.path, objects, precision)
+        return read_drawing(self.path)
+
+    def test_flat_round_trip(self):
+        objects = [LineSegment(Point(1.25, -2), Point(3, 4.5)), Oval(Point(0, 0), Point(-7, 9))]
+        self.assertEqual(flatten(self.round_trip(objects)), flatten(objects))
+
+    def test_deep_nesting_round_trip(self):
+        depth = sys.getrecursionlimit() * 2
+        node = LineSegment(Point(0, 0), Point(1, 1))
+        for i in range(depth):
+            node = CompositeShape([Oval(Point(i, i), Point(i + 2, i + 3)), node])
+        objects = [LineSegment(), node, Oval()]
+        self.assertEqual(flatten(self.round_trip(objects)), flatten(objects))
+
+    def test_wide_and_nested_groups(self):
+        inner = [CompositeShape([LineSegment(Point(i, 0), Point(i, 1)) for i in range(50)]) for _ in range(20)]
+        objects = [CompositeShape(inner[:10]), CompositeShape([CompositeShape(inner[10:]), Oval()])]
+        self.assertEqual(flatten(self.round_trip(objects)), flatten(objects))
+
+    def test_float32_precision(self):
+        objects = [LineSegment(Point(0.5, 1.25), Point(1e6, -3))]
+        self.assertEqual(flatten(self.round_trip(objects, 'f')), flatten(objects))
+
+    def test_objects_are_built_lazily_and_kept(self):
+        write_binary_drawing(self.path, [LineSegment(), Oval(), LineSegment()])
+        with BinaryDrawing(self.path) as drawing:
+            self.assertEqual(len(drawing), 3)
+            self.assertEqual(drawing.materialized, {})
+            self.assertIs(drawing[-2], drawing[1])
+            self.assertEqual(list(drawing.materialized), [1])
+
+    def test_corrupt_refs_raise_value_error(self):
+        group = CompositeShape([LineSegment(), CompositeShape([Oval(), LineSegment()])])
+        write_binary_drawing(self.path, [group])
+        with BinaryDrawing(self.path) as drawing:
+            child_refs = drawing.child_refs.tolist()
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        packed = struct.pack(f'<{len(child_refs)}i', *child_refs)
+        offset = data.rindex(packed)
+
+        # a leaf past the end, a composite past the end, and a cycle
+        for bad_ref in (99, -99, -1):
+            corrupt = bytearray(data)
+            struct.pack_into('<i', corrupt, offset, bad_ref)
+            with open(self.path, 'wb') as f:
+                f.write(corrupt)
+            with self.assertRaises(DrawingFormatError):
+                read_drawing(self.path)
+
+    def write_sections(self, kinds, coords, composites, child_refs, top_refs):
+        # a hand-made file, the writer can't produce a corrupt one
+        with open(self.path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, ord('d'), len(kinds), len(composites) // 2, len(child_refs), len(top_refs)))
+            for section in (bytes(kinds), struct.pack(f'<{len(coords)}d', *coords),
+                            struct.pack(f'<{len(composites)}i', *composites),
+                            struct.pack(f'<{len(child_refs)}i', *child_refs),
+                            struct.pack(f'<{len(top_refs)}i', *top_refs)):
+                f.write(bytes(_align(f.tell()) - f.tell()))
+                f.write(section)
+
+    def test_shared_composites_are_rejected(self):
+        # composite k lists composite k + 1 twice, 2^24 leaves if followed
+        depth = 24
+        composites = []
+        child_refs = []
+        for k in range(depth - 1):
+            composites.extend((len(child_refs), 2))
+            child_refs.extend((-(k + 2), -(k + 2)))
+        composites.extend((len(child_refs), 1))
+        child_refs.append(0)
+        self.write_sections([0], [0, 0, 1, 1], composites, child_refs, [-1])
+        self.assertLess(os.path.getsize(self.path), 1024)
+        with self.assertRaises(DrawingFormatError):
+            read_drawing(self.path)
+
+    def test_composite_shared_with_the_top_level_is_rejected(self):
+        self.write_sections([0], [0, 0, 1, 1], [0, 1, 1, 1], [-2, 0], [-1, -2])
+        with BinaryDrawing(self.path) as drawing:
+            with self.assertRaises(DrawingFormatError):
+                list(drawing)
+
+    def test_not_a_binary_drawing(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'GOATBIN1')
+        with self.assertRaises(DrawingFormatError):
+            BinaryDrawing(self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
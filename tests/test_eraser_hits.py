@@ -0,0 +1,74 @@
+import unittest
+from geometry.composite_shape import CompositeShape
+from geometry.oval import Oval
+from geometry.point import Point
+from geometry.utils import segment_bounding_box
+from support import random_model
+
+
+class EraserHitsTest(unittest.TestCase):
+    def random_path(self, rng, points, extent):
+        return [Point(rng.uniform(0, extent), rng.uniform(0, extent)) for _ in range(points)]
+
+    def brute_force(self, model, path):
+        # every object against every segment, no index and no prefilter
+        return {obj for obj in model.list()
+                for i in range(len(path) - 1) if obj.intersects_segment(path[i], path[i + 1])}
+
+    def assert_paths_match(self, model, rng, threshold_side):
+        threshold = model.VECTORIZE_THRESHOLD
+        checked = 0
+        for _ in range(40):
+            if checked == 8:
+                break
+            path = self.random_path(rng, 4, 300)
+            # the side of the threshold is decided per segment
+            sides = {len(model.spatial_index.query_rect(segment_bounding_box(path[i], path[i + 1]))) >= threshold
+                     for i in range(len(path) - 1)}
+            if sides != {threshold_side}:
+                continue
+            checked += 1
+            found = model.find_graphical_objects_touching_path(path)
+            self.assertEqual(len(found), len(set(found)))
+            self.assertEqual(set(found), self.brute_force(model, path))
+
+            shape_arrays, model.shape_arrays = model.shape_arrays, None
+            try:
+                self.assertEqual(set(model.find_graphical_objects_touching_path(path)), set(found))
+            finally:
+                model.shape_arrays = shape_arrays
+        self.assertGreater(checked, 0)
+
+    def test_short_strokes_below_the_threshold(self):
+        model, rng = random_model(4, 200, 300)
+        self.assert_paths_match(model, rng, threshold_side=False)
+
+    def test_long_strokes_above_the_threshold(self):
+        model, rng = random_model(5, 3000, 300)
+        self.assert_paths_match(model, rng, threshold_side=True)
+
+    def test_a_single_click_erases_what_is_under_it(self):
+        model, rng = random_model(6, 500, 300)
+        for _ in range(50):
+            p = Point(rng.uniform(0, 300), rng.uniform(0, 300))
+            self.assertEqual(set(model.find_graphical_objects_touching_path([p])), self.brute_force(model, [p, p]))
+
+    def test_segments_through_filled_shapes_intersect(self):
+        # any sampled point inside an oval means the segment touches it
+        model, rng = random_model(7, 300, 300)
+        for _ in range(60):
+            start, end = self.random_path(rng, 2, 300)
+            samples = [Point(start.x + (end.x - start.x) * t / 50, start.y + (end.y - start.y) * t / 50)
+                       for t in range(51)]
+            for obj in model.list():
+                leaves = obj.get_leaves() if isinstance(obj, CompositeShape) else [obj]
+                inside = any(isinstance(leaf, Oval) and leaf.get_bounding_box().width > 0
+                             and leaf.get_bounding_box().height > 0
+                             and leaf.selection_distance(p) == 0
+                             for leaf in leaves for p in samples)
+                if inside:
+                    self.assertTrue(obj.intersects_segment(start, end))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from document.document_model import DocumentModel
+from geometry.composite_shape import CompositeShape
+from geometry.line import LineSegment
+from geometry.oval import Oval
+from geometry.point import Point
+from state.eraser_state import EraserState
+from state.select_shape_state import SelectShapeState
+from support import describe
+
+
+def snapshot(model):
+    # the objects themselves, undo must bring back the same instances
+    objects = model.list()
+    return objects, describe(objects)
+
+
+class HistoryTest(unittest.TestCase):
+    def setUp(self):
+        self.model = DocumentModel()
+        self.line = LineSegment(Point(0, 0), Point(10, 0))
+        self.oval = Oval(Point(20, 20), Point(30, 30))
+        self.other = LineSegment(Point(0, 50), Point(10, 60))
+        for obj in (self.line, self.oval, self.other):
+            self.model.add_graphical_object(obj)
+        self.model.history.clear()
+
+    def assert_undo_redo(self, before):
+        after = snapshot(self.model)
+        self.assertTrue(self.model.history.can_undo())
+        self.model.undo()
+        self.assertEqual(snapshot(self.model), before)
+        self.model.redo()
+        self.assertEqual(snapshot(self.model), after)
+
+    def test_group(self):
+        before = snapshot(self.model)
+        self.line.set_selected(True)
+        self.oval.set_selected(True)
+        SelectShapeState(self.model).key_pressed('g')
+        self.assertEqual(len(self.model.list()), 2)
+        self.assert_undo_redo(before)
+
+    def test_ungroup(self):
+        group = CompositeShape([self.line, self.oval])
+        with self.model.batch():
+            self.model.remove_graphical_object(self.line)
+            self.model.remove_graphical_object(self.oval)
+            self.model.add_graphical_object(group, 0)
+        self.model.history.clear()
+
+        before = snapshot(self.model)
+        group.set_selected(True)
+        SelectShapeState(self.model).key_pressed('u')
+        self.assertNotIn(group, self.model.list())
+        self.assert_undo_redo(before)
+
+    def test_move_group_after_ungroup_and_undo(self):
+        # undoing the ungroup brings back the group, later edits to it
+        # must undo as well
+        group = CompositeShape([self.line, self.oval])
+        with self.model.batch():
+            self.model.remove_graphical_object(self.line)
+            self.model.remove_graphical_object(self.oval)
+            self.model.add_graphical_object(group)
+        group.set_selected(True)
+        state = SelectShapeState(self.model)
+        state.key_pressed('u')
+        self.model.undo()
+
+        before = snapshot(self.model)
+        state.key_pressed('Right')
+        self.assertEqual(self.line.get_hot_point(0), Point(1, 0))
+        self.assert_undo_redo(before)
+
+    def test_erase(self):
+        before = snapshot(self.model)
+        state = EraserState(self.model)
+        state.mouse_down(Point(5, -5), False, False)
+        state.mouse_dragged(Point(5, 5))
+        state.mouse_dragged(Point(25, 25))
+        state.mouse_up(Point(25, 26), False, False)
+        self.assertEqual(self.model.list(), [self.other])
+        self.assert_undo_redo(before)
+
+    def test_erase_restores_z_order(self):
+        state = EraserState(self.model)
+        self.model.increase_z(self.line)
+        before = snapshot(self.model)
+        state.mouse_down(Point(5, -5), False, False)
+        state.mouse_up(Point(5, 5), False, False)
+        self.assertEqual(self.model.list(), [self.oval, self.other])
+        self.assert_undo_redo(before)
+
+    def test_drags_with_separate_states_undo_separately(self):
+        # switching tools in between frees the state, and a new one may
+        # get the same id(); its drags must still not merge with the last
+        states = []
+        for obj in (self.line, self.oval, self.other):
+            state = SelectShapeState(self.model)
+            obj.set_selected(True)
+            state.mouse_down(obj.get_hot_point(1), False, False)
+            state.mouse_dragged(Point(90, 90))
+            state.mouse_up(Point(90, 90), False, False)
+            states.append(snapshot(self.model))
+            state.on_leaving()
+            del state
+
+        for expected in reversed(states[:-1]):
+            self.model.undo()
+            self.assertEqual(snapshot(self.model), expected)
+
+    def test_adding_a_big_group_counts_every_leaf(self):
+        group = CompositeShape([LineSegment() for _ in range(1000)])
+        self.model.add_graphical_object(group)
+        self.assertGreater(self.model.history.cost, 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
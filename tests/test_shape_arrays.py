@@ -0,0 +1,45 @@
+import unittest
+from document.shape_arrays import HAS_NUMPY
+from geometry.point import Point
+from support import random_model
+
+
+@unittest.skipUnless(HAS_NUMPY, 'NumPy is not installed')
+class ShapeArraysTest(unittest.TestCase):
+    def test_selection_distances_match_python(self):
+        model, rng = random_model(1, 500, 300)
+        objects = model.list()
+        for _ in range(20):
+            p = Point(rng.uniform(-10, 310), rng.uniform(-10, 310))
+            distances = model.shape_arrays.selection_distances(objects, p)
+            for obj, distance in zip(objects, distances):
+                self.assertAlmostEqual(distance, obj.selection_distance(p), delta=1e-9)
+
+    def assert_selection_matches(self, model, rng, threshold_side):
+        threshold = model.VECTORIZE_THRESHOLD
+        checked = 0
+        for _ in range(200):
+            p = Point(rng.uniform(0, 300), rng.uniform(0, 300))
+            candidates = model.spatial_index.query_point(p, model.SELECTION_PROXIMITY)
+            if (len(candidates) >= threshold) != threshold_side:
+                continue
+            checked += 1
+            vectorized = model.find_selected_graphical_object(p)
+            shape_arrays, model.shape_arrays = model.shape_arrays, None
+            try:
+                self.assertIs(vectorized, model.find_selected_graphical_object(p))
+            finally:
+                model.shape_arrays = shape_arrays
+        self.assertGreater(checked, 0)
+
+    def test_picking_below_the_threshold(self):
+        model, rng = random_model(2, 300, 300)
+        self.assert_selection_matches(model, rng, threshold_side=False)
+
+    def test_picking_above_the_threshold(self):
+        model, rng = random_model(3, 3000, 300)
+        self.assert_selection_matches(model, rng, threshold_side=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
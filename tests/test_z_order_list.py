@@ -0,0 +1,72 @@
+import random
+import unittest
+from document.z_order_list import ZOrderList
+
+
+class ZOrderListTest(unittest.TestCase):
+    def assert_matches(self, objects, expected):
+        self.assertEqual(list(objects), expected)
+        self.assertEqual(len(objects), len(expected))
+        for i, obj in enumerate(expected):
+            self.assertIs(objects[i], obj)
+            self.assertEqual(objects.index(obj), i)
+            self.assertIn(obj, objects)
+
+    def test_random_operations_match_a_list(self):
+        rng = random.Random(8)
+        objects = ZOrderList()
+        expected = []
+        next_obj = 0
+        for _ in range(3000):
+            op = rng.random()
+            if op < 0.4 or not expected:
+                index = rng.randint(0, len(expected))
+                objects.insert(index, next_obj)
+                expected.insert(index, next_obj)
+                next_obj += 1
+            elif op < 0.75:
+                obj = rng.choice(expected)
+                objects.remove(obj)
+                expected.remove(obj)
+            else:
+                a = rng.randrange(len(expected))
+                b = rng.randrange(len(expected))
+                objects.swap(a, b)
+                expected[a], expected[b] = expected[b], expected[a]
+            self.assertEqual(list(objects), expected)
+        self.assert_matches(objects, expected)
+
+    def test_undo_puts_an_object_back_into_its_hole(self):
+        objects = ZOrderList(range(10))
+        objects.remove(4)
+        objects.insert(4, 4)
+        self.assertEqual(objects.holes, 0)
+        self.assert_matches(objects, list(range(10)))
+
+    def test_holes_are_compacted(self):
+        objects = ZOrderList(range(200))
+        for obj in range(0, 200, 2):
+            objects.remove(obj)
+        for obj in range(1, 150, 2):
+            objects.remove(obj)
+        self.assertLessEqual(objects.holes, len(objects) + ZOrderList.MIN_COMPACT_HOLES)
+        self.assert_matches(objects, list(range(151, 200, 2)))
+
+    def test_negative_indices(self):
+        objects = ZOrderList('abc')
+        self.assertEqual(objects[-1], 'c')
+        objects.swap(0, -1)
+        self.assertEqual(list(objects), ['c', 'b', 'a'])
+        with self.assertRaises(IndexError):
+            objects[3]
+
+    def test_duplicates_are_rejected(self):
+        objects = ZOrderList('ab')
+        with self.assertRaises(ValueError):
+            objects.append('a')
+        with self.assertRaises(ValueError):
+            objects.insert(0, 'b')
+
+
+if __name__ == '__main__':
+    unittest.main()